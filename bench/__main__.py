@@ -0,0 +1,227 @@
+"""Offline end-to-end benchmark of the generator.
+
+Serves a synthetic catalog from a local stand-in for GitHub and Forgejo, runs
+``generate_repo`` and ``generate_repo_mapping`` against it in a child process and reports
+wall time, peak RSS and the requests the stand-in received. The first run starts with an
+empty cache, the following runs reuse it.
+
+    python -m bench --mods 500 --releases 3 --runs 2
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import pathlib
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from .standin import Catalog, StandIn
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+
+
+def peak_rss(who: int = resource.RUSAGE_SELF) -> int:
+    """Peak resident set size in bytes.
+
+    :param who: ``RUSAGE_SELF`` for this process, ``RUSAGE_CHILDREN`` for the largest of its
+        terminated children, like the parse workers
+
+    """
+    rss = resource.getrusage(who).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def child(config_path: str):
+    """Run the generator once, configured by the benchmark, and print the measurements as json.
+
+    :param config_path: json file written by the benchmark
+
+    """
+    with open(config_path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    os.environ["GITHUB_TOKEN"] = "bench"
+    os.environ["GITHUB_API_URL"] = config["url"] + "/github"
+    os.environ["GITHUB_RATE_LIMIT_RESERVE"] = "0"
+    os.environ["GITHUB_GRAPHQL_URL"] = config["graphql"]
+    sys.path.insert(0, str(ROOT))
+    import main as generator
+
+    start = time.perf_counter()
+    asyncio.run(generator.run(config["settings"], config["workers"]))
+    seconds = time.perf_counter() - start
+    print(
+        json.dumps(
+            {
+                "seconds": seconds,
+                "peak_rss": peak_rss(),
+                "peak_rss_children": peak_rss(resource.RUSAGE_CHILDREN),
+            }
+        )
+    )
+
+
+def make_settings(catalog: Catalog, url: str, provider: str) -> dict:
+    with open(ROOT / "settings.json", "r", encoding="utf-8") as f:
+        setts = json.load(f)
+    mods = []
+    for i, name in enumerate(catalog.repo_names()):
+        mod_provider = provider if provider != "mixed" else ("github", "forgejo")[i % 2]
+        mod = {"provider": mod_provider, "repo": f"bench/{name}"}
+        if mod_provider == "forgejo":
+            mod["instance"] = url
+        mods.append(mod)
+    setts["mods"] = mods
+    setts["repos"] = [f"{url}/remote/{i}/repo.json" for i in range(catalog.remote_repos)]
+    # Served from elsewhere than the releases, as in production, so the release jars aren't
+    # taken for files of the repo
+    setts["address"] = "https://bench.invalid/"
+    return setts
+
+
+def run_once(workdir: pathlib.Path, config: dict, standin: StandIn) -> dict:
+    config_path = workdir / "bench-config.json"
+    config_path.write_text(json.dumps(config), encoding="utf-8")
+    standin.reset()
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-m", "bench", "--child", str(config_path)],
+        cwd=workdir,
+        env={**os.environ, "PYTHONPATH": str(ROOT)},
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+    )
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(
+            f"Generator exited with {proc.returncode}, see {workdir / 'main.log'}"
+        )
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    with open(workdir / "repo.json", "r", encoding="utf-8") as f:
+        result["mods"] = len(json.load(f)["mods"])
+    result["wall"] = wall
+    result["requests"] = dict(standin.requests.most_common())
+    result["requests_total"] = sum(
+        count for kind, count in standin.requests.items() if kind != "304 Not Modified"
+    )
+    result["bytes_served"] = standin.bytes
+    return result
+
+
+def print_result(label: str, result: dict):
+    print(
+        f"{label}: {result['seconds']:.2f}s generator, {result['wall']:.2f}s wall, "
+        f"peak RSS {result['peak_rss'] / 1024 / 1024:.1f} MiB "
+        f"(child processes {result['peak_rss_children'] / 1024 / 1024:.1f} MiB), {result['mods']} mods, "
+        f"{result['requests_total']} requests ({result['requests'].get('304 Not Modified', 0)} not modified), "
+        f"{result['bytes_served'] / 1024:.0f} KiB served"
+    )
+    for kind, count in result["requests"].items():
+        print(f"    {count:>7}  {kind}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        prog="python -m bench", description="Benchmark the generator offline."
+    )
+    parser.add_argument("--mods", type=int, default=10, help="Number of mods in the catalog.")
+    parser.add_argument("--releases", type=int, default=3, help="Releases per mod.")
+    parser.add_argument("--jar-size", type=int, default=16 * 1024, help="Filler bytes per jar.")
+    parser.add_argument("--remote-repos", type=int, default=5, help="Remote repos in the mapping.")
+    parser.add_argument(
+        "--provider",
+        choices=("github", "forgejo", "mixed"),
+        default="mixed",
+        help="Provider the mods are served by.",
+    )
+    parser.add_argument(
+        "--rate-limit", type=int, help="GitHub REST requests allowed per run, unlimited by default."
+    )
+    parser.add_argument(
+        "--no-graphql",
+        action="store_true",
+        help="Make GraphQL queries fail, so the GitHub provider falls back to the REST API.",
+    )
+    parser.add_argument("--runs", type=int, default=2, help="Runs, the first with an empty cache.")
+    parser.add_argument(
+        "--workers",
+        metavar="STAGE=COUNT",
+        action="append",
+        default=[],
+        help="Passed on to the generator, see main.py --help.",
+    )
+    parser.add_argument("--workdir", help="Keep the working directory here instead of a temporary one.")
+    parser.add_argument(
+        "--keep-cache",
+        action="store_true",
+        help="Start from the cache left in --workdir by an earlier benchmark, instead of a cold run.",
+    )
+    parser.add_argument("--output", help="Write the results as json to this file.")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.child:
+        child(args.child)
+        return
+
+    catalog = Catalog(
+        mods=args.mods,
+        releases=args.releases,
+        jar_size=args.jar_size,
+        remote_repos=args.remote_repos,
+        rate_limit=args.rate_limit,
+    )
+    standin = StandIn(catalog)
+    url = standin.start()
+    workdir = pathlib.Path(args.workdir or tempfile.mkdtemp(prefix="autorepo-bench-"))
+    if not args.keep_cache:
+        shutil.rmtree(workdir / ".cache", ignore_errors=True)
+    workdir.mkdir(parents=True, exist_ok=True)
+    config = {
+        "url": url,
+        "graphql": url + ("/github/no-graphql" if args.no_graphql else "/github/graphql"),
+        "settings": make_settings(catalog, url, args.provider),
+        "workers": dict(
+            (stage, int(count))
+            for stage, _, count in (w.partition("=") for w in args.workers)
+        ),
+    }
+    print(
+        f"Catalog: {catalog.mods} mods x {catalog.releases} releases ({args.provider}), "
+        f"{catalog.remote_repos} remote repos, workdir {workdir}"
+    )
+    results = []
+    try:
+        for n in range(args.runs):
+            result = run_once(workdir, config, standin)
+            results.append(result)
+            label = "cold" if n == 0 and not args.keep_cache else "warm"
+            print_result(f"{label} run {n + 1}", result)
+    finally:
+        standin.stop()
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "catalog": vars(catalog),
+                    "provider": args.provider,
+                    "workers": config["workers"],
+                    "runs": results,
+                },
+                f,
+                indent=4,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,365 @@
+import asyncio
+import hashlib
+import io
+import json
+import threading
+import zipfile
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from aiohttp import web
+
+EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+@dataclass
+class Catalog:
+    """Describes the synthetic catalog served by the stand-in.
+
+    Mod ``i`` lives in the repository ``bench/mod<i>``. Even mods are fabric mods, odd mods quilt mods.
+    """
+
+    mods: int = 10
+    releases: int = 3
+    jar_size: int = 16 * 1024
+    remote_repos: int = 5
+    remote_mods: int = 50
+    rate_limit: Optional[int] = None
+
+    def versions(self) -> list[str]:
+        versions = [f"1.{n}.0" for n in range(self.releases)]
+        if self.releases > 1:
+            versions[-1] += "-beta"
+        return versions
+
+    def repo_names(self) -> list[str]:
+        return [f"mod{i}" for i in range(self.mods)]
+
+
+def published_at(n: int) -> str:
+    return (EPOCH + timedelta(days=n)).isoformat().replace("+00:00", "Z")
+
+
+def make_jar(catalog: Catalog, name: str, version: str) -> bytes:
+    """Build a jar with fabric or quilt metadata, an icon and some filler classes.
+
+    :param catalog: the catalog the jar belongs to
+    :param name: the repository name, like "mod3"
+    :param version: the version of the mod
+
+    """
+    index = int(name.removeprefix("mod"))
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as jar:
+        if index % 2 == 0:
+            jar.writestr(
+                "fabric.mod.json",
+                json.dumps(
+                    {
+                        "id": name,
+                        "version": version,
+                        "name": name,
+                        "description": f"Benchmark mod {name}",
+                        "authors": ["bench"],
+                        "icon": f"assets/{name}/icon.png",
+                        "depends": {
+                            "cosmic_reach": ">=0.1.0",
+                            "fabricloader": ">=0.14.0",
+                        },
+                    }
+                ),
+            )
+        else:
+            jar.writestr(
+                "quilt.mod.json",
+                json.dumps(
+                    {
+                        "quilt_loader": {
+                            "id": name,
+                            "group": "io.github.bench",
+                            "version": version,
+                            "metadata": {
+                                "name": name,
+                                "description": f"Benchmark mod {name}",
+                                "contributors": {"bench": "Owner"},
+                                "icon": f"assets/{name}/icon.png",
+                            },
+                            "depends": [
+                                {"id": "cosmic_reach", "versions": ">=0.1.0"},
+                                {"id": "cosmic_quilt", "versions": ">=1.0.0"},
+                            ],
+                        }
+                    }
+                ),
+            )
+        jar.writestr(f"assets/{name}/icon.png", b"\x89PNG\r\n\x1a\n" + bytes(64))
+        seed = hashlib.sha256(f"{name}-{version}".encode("utf-8")).digest()
+        filler = (seed * (catalog.jar_size // len(seed) + 1))[: catalog.jar_size]
+        jar.writestr(f"com/example/{name}/Main.class", filler)
+    return buffer.getvalue()
+
+
+class StandIn:
+    """A local stand-in for the GitHub and Forgejo APIs, serving a synthetic catalog.
+
+    Implements the endpoints used by ``utils.provider.github`` (REST and GraphQL, under ``/github``) and
+    ``utils.provider.forgejo``, the release jars, and remote repo files for the repo mapping.
+    GET responses carry an ETag and are answered with ``304 Not Modified`` when revalidated.
+    With ``Catalog.rate_limit`` set, the GitHub REST API enforces a rate limit like GitHub does.
+    """
+
+    def __init__(self, catalog: Catalog):
+        self.catalog = catalog
+        self.requests: Counter = Counter()
+        self.bytes = 0
+        self.rate_used = 0
+        self.url = None
+        self._loop = None
+        self._runner = None
+        self.app = web.Application(middlewares=[self._count])
+        self.app.router.add_post("/github/graphql", self.graphql)
+        self.app.router.add_get("/github/rate_limit", self.github_rate_limit)
+        self.app.router.add_get("/github/repos/{owner}/{name}", self.github_repo)
+        self.app.router.add_get("/github/repos/{owner}/{name}/contributors", self.github_contributors)
+        self.app.router.add_get("/github/repos/{owner}/{name}/releases", self.github_releases)
+        self.app.router.add_get("/github/repos/{owner}/{name}/commits", self.github_commits)
+        self.app.router.add_get("/api/v1/repos/{owner}/{name}", self.forgejo_repo)
+        self.app.router.add_get("/api/v1/repos/{owner}/{name}/commits", self.forgejo_commits)
+        self.app.router.add_get("/api/v1/repos/{owner}/{name}/releases", self.forgejo_releases)
+        self.app.router.add_get("/jars/{name}/{version}/{file}", self.jar)
+        self.app.router.add_get("/remote/{index}/repo.json", self.remote_repo)
+
+    def _rate_headers(self) -> dict[str, str]:
+        return {
+            "X-RateLimit-Limit": str(self.catalog.rate_limit),
+            "X-RateLimit-Remaining": str(max(self.catalog.rate_limit - self.rate_used, 0)),
+            "X-RateLimit-Reset": str(int(EPOCH.timestamp()) + 10**9),
+            "X-RateLimit-Resource": "core",
+        }
+
+    @web.middleware
+    async def _count(self, request: web.Request, handler):
+        kind = request.match_info.route.resource.canonical if request.match_info.route.resource else "unknown"
+        self.requests[f"{request.method} {kind}"] += 1
+        limited = self.catalog.rate_limit is not None and kind.startswith("/github/repos/")
+        if limited and self.rate_used >= self.catalog.rate_limit:
+            self.requests["403 Rate Limited"] += 1
+            return web.json_response(
+                {"message": "API rate limit exceeded"}, status=403, headers=self._rate_headers()
+            )
+        resp = await handler(request)
+        if request.method == "GET" and resp.body is not None:
+            etag = '"' + hashlib.sha256(resp.body).hexdigest()[:32] + '"'
+            if request.headers.get("If-None-Match") == etag:
+                self.requests["304 Not Modified"] += 1
+                # Like on GitHub, conditional requests answered with 304 don't count against the rate limit
+                return web.Response(
+                    status=304,
+                    headers={"ETag": etag, **(self._rate_headers() if limited else {})},
+                )
+            resp.headers["ETag"] = etag
+        if limited:
+            self.rate_used += 1
+            resp.headers.update(self._rate_headers())
+        if resp.body is not None:
+            self.bytes += len(resp.body)
+        return resp
+
+    def reset(self):
+        self.requests.clear()
+        self.bytes = 0
+        self.rate_used = 0
+
+    def _base(self, request: web.Request) -> str:
+        return f"http://{request.host}"
+
+    def _releases(self, request: web.Request, name: str) -> list[dict]:
+        return [
+            {
+                "id": n,
+                "tag_name": "v" + version,
+                "name": version,
+                "body": f"Release {version} of {name}",
+                "draft": False,
+                "prerelease": "-" in version,
+                "published_at": published_at(n),
+                "html_url": f"{self._base(request)}/bench/{name}/releases/v{version}",
+                "author": {"login": "bench"},
+                "assets": [
+                    {
+                        "name": f"{name}-{version}.jar",
+                        "browser_download_url": f"{self._base(request)}/jars/{name}/{version}/{name}-{version}.jar",
+                    }
+                ],
+            }
+            for n, version in enumerate(self.catalog.versions())
+        ]
+
+    def _commit(self, request: web.Request, name: str) -> dict:
+        return {
+            "sha": hashlib.sha1(name.encode("utf-8")).hexdigest(),
+            "html_url": f"{self._base(request)}/bench/{name}/commit",
+            "created": published_at(0).replace("Z", "+00:00"),
+            "author": {"login": "bench"},
+            "commit": {
+                "message": "Benchmark commit\n\nbody",
+                "author": {"name": "bench", "date": published_at(0)},
+            },
+        }
+
+    def _repository(self, request: web.Request, owner: str, name: str) -> dict:
+        return {
+            "full_name": f"{owner}/{name}",
+            "clone_url": f"{self._base(request)}/{owner}/{name}.git",
+            "html_url": f"{self._base(request)}/{owner}/{name}",
+            "owner": {"login": owner},
+            "default_branch": "main",
+            "pushed_at": published_at(self.catalog.releases),
+            "updated_at": published_at(self.catalog.releases),
+        }
+
+    async def github_rate_limit(self, request: web.Request):
+        if self.catalog.rate_limit is None:
+            return web.json_response({"resources": {}})
+        headers = self._rate_headers()
+        core = {
+            "limit": self.catalog.rate_limit,
+            "remaining": int(headers["X-RateLimit-Remaining"]),
+            "reset": int(headers["X-RateLimit-Reset"]),
+            "used": self.rate_used,
+        }
+        return web.json_response({"resources": {"core": core}, "rate": core}, headers=headers)
+
+    async def github_repo(self, request: web.Request):
+        return web.json_response(
+            self._repository(request, request.match_info["owner"], request.match_info["name"])
+        )
+
+    async def github_contributors(self, request: web.Request):
+        if request.query.get("page", "1") != "1":
+            return web.json_response([])
+        return web.json_response([{"login": "bench"}, {"login": "contributor"}])
+
+    async def github_releases(self, request: web.Request):
+        if request.query.get("page", "1") != "1":
+            return web.json_response([])
+        return web.json_response(self._releases(request, request.match_info["name"]))
+
+    async def github_commits(self, request: web.Request):
+        return web.json_response([self._commit(request, request.match_info["name"])])
+
+    async def graphql(self, request: web.Request):
+        variables = (await request.json())["variables"]
+        data = {}
+        for key, owner in variables.items():
+            if not key.startswith("owner"):
+                continue
+            i = key.removeprefix("owner")
+            name = variables["name" + i]
+            commit = self._commit(request, name)
+            data["r" + i] = {
+                "nameWithOwner": f"{owner}/{name}",
+                "url": f"{self._base(request)}/{owner}/{name}",
+                "pushedAt": published_at(self.catalog.releases),
+                "updatedAt": published_at(self.catalog.releases),
+                "owner": {"login": owner},
+                "defaultBranchRef": {
+                    "name": "main",
+                    "target": {
+                        "oid": commit["sha"],
+                        "message": commit["commit"]["message"],
+                        "messageHeadline": commit["commit"]["message"].split("\n")[0],
+                        "authoredDate": published_at(0),
+                        "url": commit["html_url"],
+                        "author": {"name": "bench", "user": {"login": "bench"}},
+                        "history": {
+                            "nodes": [
+                                {"author": {"user": {"login": "bench"}}},
+                                {"author": {"user": {"login": "contributor"}}},
+                            ]
+                        },
+                    },
+                },
+                "releases": {
+                    "pageInfo": {"hasNextPage": False},
+                    "nodes": [
+                        {
+                            "databaseId": r["id"],
+                            "tagName": r["tag_name"],
+                            "name": r["name"],
+                            "description": r["body"],
+                            "isDraft": False,
+                            "isPrerelease": r["prerelease"],
+                            "publishedAt": r["published_at"],
+                            "url": r["html_url"],
+                            "author": r["author"],
+                            "releaseAssets": {
+                                "pageInfo": {"hasNextPage": False},
+                                "nodes": [
+                                    {"name": a["name"], "downloadUrl": a["browser_download_url"]}
+                                    for a in r["assets"]
+                                ],
+                            },
+                        }
+                        for r in self._releases(request, name)
+                    ],
+                },
+            }
+        return web.json_response({"data": data})
+
+    async def forgejo_repo(self, request: web.Request):
+        return web.json_response(
+            self._repository(request, request.match_info["owner"], request.match_info["name"])
+        )
+
+    async def forgejo_commits(self, request: web.Request):
+        return web.json_response([self._commit(request, request.match_info["name"])])
+
+    async def forgejo_releases(self, request: web.Request):
+        releases = self._releases(request, request.match_info["name"])
+        for release in releases:
+            release["published_at"] = release["published_at"].replace("Z", "+00:00")
+        return web.json_response(releases)
+
+    async def jar(self, request: web.Request):
+        body = await asyncio.to_thread(
+            make_jar, self.catalog, request.match_info["name"], request.match_info["version"]
+        )
+        return web.Response(body=body, content_type="application/java-archive")
+
+    async def remote_repo(self, request: web.Request):
+        index = int(request.match_info["index"])
+        return web.json_response(
+            {
+                "specVersion": 2,
+                "rootId": f"bench.remote{index}",
+                "mods": [
+                    {"id": f"bench.remote.mod{(index * 7 + n) % (self.catalog.remote_mods * 2)}"}
+                    for n in range(self.catalog.remote_mods)
+                ],
+            }
+        )
+
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Serve the stand-in from a background thread.
+
+        :param host: the interface to listen on
+        :param port: the port to listen on, 0 picks a free one
+        :returns: the base url of the stand-in
+
+        """
+        self._loop = asyncio.new_event_loop()
+        self._runner = web.AppRunner(self.app, access_log=None)
+        self._loop.run_until_complete(self._runner.setup())
+        site = web.TCPSite(self._runner, host, port)
+        self._loop.run_until_complete(site.start())
+        port = site._server.sockets[0].getsockname()[1]
+        threading.Thread(target=self._loop.run_forever, daemon=True).start()
+        self.url = f"http://{host}:{port}"
+        return self.url
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
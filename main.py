@@ -1,23 +1,47 @@
+import argparse
+import asyncio
 import json
 import os
-import platform
-import shutil
-import subprocess
 import sys
 import time
 from typing import Optional
 
-import hjson
-import requests
+from aiohttp import ClientError, web
 from crm1.spec.v2 import RMod
 from jjjxutils.decorators import entrypoint
 from loguru import logger
 
-from utils import ClonedRepo, UnzippedJar, datacls, download_jar
+from utils import (
+    TMP_DIRS,
+    ClonedRepo,
+    datacls,
+    file_sha256,
+)
+from utils import jars, webhooks
 from utils import parser as parsers
+from utils import pipeline as pipelines
 from utils import provider as providers
-
-is_windows = platform.system() == "Windows"
+from utils.artifacts import ARTIFACTS
+from utils.build_cache import BUILD_CACHE
+from utils.compact import intern_strings
+from utils.cache_manager import CACHE_MANAGER
+from utils.cache_manager import DEFAULT_BUDGET as DEFAULT_CACHE_BUDGET
+from utils.delta import DELTA_FEED
+from utils.download import DOWNLOADS, DownloadError
+from utils.gradle import DEFAULT_BUDGET as DEFAULT_GRADLE_BUDGET
+from utils.gradle import GRADLE
+from utils.http import SESSIONS
+from utils.icons import ICONS
+from utils.memo import PARSE_MEMO
+from utils.output import output_paths, write_outputs
+from utils.previous import PREVIOUS
+from utils.publish import SITE
+from utils.ratelimit import RateLimitExceeded
+from utils.remote import REMOTE_REPOS
+from utils.report import REPORT
+from utils.scheduler import schedule
+from utils.shards import SHARDS
+from utils.versions import VersionIndex
 
 logger.remove()
 logger.add(
@@ -34,13 +58,9 @@ logger.add(
 )
 
 
-def get_repo_jarpath(
-    suffix_priority: list[str],
-    main_address: str,
-    settings: datacls.ModSettings,
-    repo: datacls.Repo,
-    release: datacls.Release,
-) -> Optional[str]:
+def sort_jars(
+    suffix_priority: list[str], files: list[tuple[str, str]]
+) -> list[tuple[str, str]]:
 
     def get_prio(name: str):
         for prio, end in suffix_priority:
@@ -48,101 +68,132 @@ def get_repo_jarpath(
                 return prio
         return len(suffix_priority)
 
-    if not release.is_prebuilt:
-        logger.info(f"[{settings.repo}] [{release.version}] Cloning repository...")
-        with ClonedRepo(
+    return sorted(
+        [file for file in files if file[0].endswith(".jar")],
+        key=lambda f: (get_prio(f[0]), f[0]),
+    )
+
+
+def build_release_jar(
+    suffix_priority: list[str],
+    main_address: str,
+    settings: datacls.ModSettings,
+    repo: datacls.Repo,
+    release: datacls.Release,
+) -> Optional[str]:
+    if cached := BUILD_CACHE.get(repo.name, release.tag):
+        with REPORT.stage("gradle", settings.repo, release.version) as record:
+            record["cache_hit"] = True
+            release.attached_files, jar_path = cached
+        logger.info(
+            f"[{settings.repo}] [{release.version}] Commit {release.tag[:7]} was built before, reusing the build."
+        )
+        return jar_path
+    logger.info(f"[{settings.repo}] [{release.version}] Cloning repository...")
+    with REPORT.stage("clone", settings.repo, release.version):
+        clone = ClonedRepo(
             repo.git_url,
             ref=release.tag,
             sub=(repo.owner, repo.name.rsplit("/")[-1], release.version, "build"),
-        ) as clone:
-            logger.info(f"[{settings.repo}] [{release.version}] Building jar...")
-            run = (
-                ("cmd", "/c", "gradle", "build") if is_windows else ("gradle", "build")
+        )
+    with clone:
+        logger.info(f"[{settings.repo}] [{release.version}] Building jar...")
+        with REPORT.stage("gradle", settings.repo, release.version) as record:
+            build = GRADLE.build(
+                clone.dir,
+                "-".join((repo.owner, repo.name.rsplit("/")[-1], release.version)),
+                offline=BUILD_CACHE.has_builds(repo.name),
             )
-            proc = subprocess.Popen(
-                run, cwd=clone.dir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            record["failed"] = build.returncode != 0
+        if build.returncode is None:
+            logger.warning(
+                f"[{settings.repo}] [{release.version}] Skipping because build timed out after {GRADLE.timeout:.0f}s. (See {build.log_path})"
             )
-            proc.wait()
-            ret_val = proc.returncode
-            if ret_val != 0:
-                logger.warning(
-                    f"[{settings.repo}] [{release.version}] Skipping because build failed. (Invalid return value {ret_val})"
-                )
-                return
-            if not clone.path("build/libs").exists():
-                logger.warning(
-                    f"[{settings.repo}] [{release.version}] Skipping because build failed. (No build/libs)"
-                )
-                return
-            files = clone.path("build/libs").iterdir()
-            assets = []
-            for file in files:
-                old_path = file.absolute()
-                new_path = os.path.join(
-                    "builds", repo.owner, repo.name.rsplit("/")[-1], file.name
-                )
-                os.makedirs(os.path.dirname(new_path), exist_ok=True)
-                counter = 0
-                pause_new_path = new_path
-                while os.path.exists(new_path):
-                    new_path = pause_new_path.removesuffix(".jar") + f"-{counter}.jar"
-                    counter += 1
-                shutil.copy(old_path, new_path)
-                assets.append(
-                    (
-                        file.name,
-                        main_address.removesuffix("/")
-                        + "/"
-                        + new_path.removeprefix("/"),
-                    )
-                )
-            release.attached_files = sorted(
-                [asset for asset in assets if asset[0].endswith(".jar")],
-                key=lambda f: (get_prio(f[0]), f[0]),
+            return
+        if build.returncode != 0:
+            logger.warning(
+                f"[{settings.repo}] [{release.version}] Skipping because build failed. (Invalid return value {build.returncode}, see {build.log_path})"
             )
-            if not release.attached_files:
-                logger.warning(
-                    f"[{settings.repo}] [{release.version}] Skipping, Build seems to have failed."
+            return
+        if not clone.path("build/libs").exists():
+            logger.warning(
+                f"[{settings.repo}] [{release.version}] Skipping because build failed. (No build/libs)"
+            )
+            return
+        files = clone.path("build/libs").iterdir()
+        assets = []
+        copies = {}
+        for file in files:
+            new_path = ARTIFACTS.add(file)
+            copies[file.name] = new_path
+            assets.append(
+                (
+                    file.name,
+                    main_address.removesuffix("/") + "/" + new_path.removeprefix("/"),
                 )
-                return
-            jar_path = os.path.join(
-                clone.path("build/libs"), release.attached_files[0][0]
             )
-            logger.success(f"[{settings.repo}] [{release.version}] Build successful.")
-    else:
+        release.attached_files = sort_jars(suffix_priority, assets)
         if not release.attached_files:
             logger.warning(
-                f"[{settings.repo}] [{release.version}] Skipping because release doesn't have any assets."
+                f"[{settings.repo}] [{release.version}] Skipping, Build seems to have failed."
             )
             return
-        logger.info(
-            f"[{settings.repo}] [{release.version}] Downloading release build..."
+        jar_path = os.path.join(clone.path("build/libs"), release.attached_files[0][0])
+        BUILD_CACHE.put(
+            repo.name,
+            release.tag,
+            release.attached_files,
+            copies[release.attached_files[0][0]],
+            list(copies.values()),
+        )
+        logger.success(f"[{settings.repo}] [{release.version}] Build successful.")
+    return jar_path
+
+
+async def download_release_jar(
+    suffix_priority: list[str],
+    settings: datacls.ModSettings,
+    repo: datacls.Repo,
+    release: datacls.Release,
+) -> Optional[str]:
+    release.attached_files = sort_jars(suffix_priority, release.attached_files)
+    if not release.attached_files:
+        logger.warning(
+            f"[{settings.repo}] [{release.version}] Skipping because release doesn't have any jar assets."
         )
-        release.attached_files = sorted(
-            [asset for asset in release.attached_files if asset[0].endswith(".jar")],
-            key=lambda f: (get_prio(f[0]), f[0]),
+        return
+    logger.info(f"[{settings.repo}] [{release.version}] Downloading release build...")
+    name, url = release.attached_files[0]
+    path = (
+        TMP_DIRS.get_temp_dir(
+            repo.owner, repo.name.rsplit("/")[-1], release.version, "download"
         )
+        / name
+    )
+    with REPORT.stage("download", settings.repo, release.version) as record:
+        record["cache_hit"] = DOWNLOADS.has(url, path)
         try:
-            jar_path = download_jar(
-                release.attached_files[0][1],
-                release.attached_files[0][0],
-                sub=(
-                    repo.owner,
-                    repo.name.rsplit("/")[-1],
-                    release.version,
-                    "download",
-                ),
-            )
+            jar_path = await DOWNLOADS.download(url, path)
         except TimeoutError:
+            record["failed"] = True
             logger.error(
-                f"[{settings.repo}] [{release.version}] Download timed out: {release.attached_files[0][1]}"
+                f"[{settings.repo}] [{release.version}] Download timed out: {url}"
             )
             return
-        logger.info(f"[{settings.repo}] [{release.version}] Download successful.")
-    return jar_path
+        except (ClientError, DownloadError) as e:
+            record["failed"] = True
+            logger.error(
+                f"[{settings.repo}] [{release.version}] Skipping because the download failed ({e.__class__.__name__}: {e}): {url}"
+            )
+            return
+        if not record["cache_hit"]:
+            record["bytes"] = jar_path.stat().st_size
+    logger.info(f"[{settings.repo}] [{release.version}] Download successful.")
+    return str(jar_path)
 
 
-def get_from_release(
+async def get_from_release(
+    pipeline: pipelines.Pipeline,
     base_address: str,
     jar_path: str,
     settings: datacls.ModSettings,
@@ -150,35 +201,38 @@ def get_from_release(
     release: datacls.Release,
 ) -> Optional[RMod]:
     logger.info(f"[{settings.repo}] [{release.version}] Reading jar...")
-    with UnzippedJar(
-        jar_path,
-        sub=(repo.owner, repo.name.rsplit("/")[-1], release.version, "unzipped"),
-    ) as jar:
-        mod: Optional[RMod] = None
-        if jar["fabric.mod.json"].exists():
-            with jar.open("fabric.mod.json", "r", encoding="utf-8") as f:
-                json_content = f.read()
-                json_data = json.loads(json_content)
-            mod = parsers.parse_fabric_mod_json(
-                base_address, settings, repo, json_data, jar.dir, release
-            )
-        elif jar["quilt.mod.json"].exists():
-            with jar.open("quilt.mod.json", "r", encoding="utf-8") as f:
-                json_content = f.read()
-                json_data = json.loads(json_content)
-            mod = parsers.parse_quilt_mod_json(
-                base_address, settings, repo, json_data, jar.dir, release
-            )
-        else:
+    with REPORT.stage("memo", settings.repo, release.version) as record:
+        digest = await pipeline.parse.run(file_sha256, jar_path)
+        context = PARSE_MEMO.context(
+            base_address,
+            settings.to_dict(),
+            repo.to_dict(),
+            release.to_dict(),
+        )
+        found, cached = PARSE_MEMO.get(digest, context)
+        record["bytes"] = os.path.getsize(jar_path)
+        record["cache_hit"] = found and (
+            cached is None or not missing_files(base_address, cached)
+        )
+    if record["cache_hit"]:
+        if cached is None:
             logger.warning(
-                f"[{settings.repo}] [{release.version}] Skipping because it doesn't have a parsable config file."
+                f"[{settings.repo}] [{release.version}] Skipping because this jar failed to parse before."
             )
             return
-        if not mod:
-            logger.warning(
-                f"[{settings.repo}] [{release.version}] Skipping because it failed to parse the config file."
-            )
+        logger.debug(f"[{settings.repo}] [{release.version}] Using memoized metadata.")
+        mod = RMod.from_dict(cached)
+    else:
+        result = await pipeline.parse.run(
+            jars.parse_jar, base_address, jar_path, settings, repo, release
+        )
+        for level, message in result.logs:
+            logger.log(level, message)
+        REPORT.merge(result.records)
+        PARSE_MEMO.put(digest, context, result.mod)
+        if not result.mod:
             return
+        mod = RMod.from_dict(result.mod)
 
     if not release.is_prebuilt:
         mod.version = release.version
@@ -195,93 +249,92 @@ def get_from_release(
         )
         return
     logger.info(f"[{settings.repo}] [{release.version}] Jar read.")
-    return mod
+    return intern_strings(mod)
 
 
-def get_jars_from_releases(
+async def get_version_from_release(
+    pipeline: pipelines.Pipeline,
     suffix_priority: list[str],
     main_address: str,
     settings: datacls.ModSettings,
     repo: datacls.Repo,
-    releases: list[datacls.Release],
-) -> list[tuple[datacls.Release, str]]:
-    return [
-        (release, result)
-        for release, result in zip(
-            releases,
-            [
-                get_repo_jarpath(suffix_priority, main_address, settings, repo, release)
-                for release in releases
-            ],
+    release: datacls.Release,
+) -> Optional[RMod]:
+    async with pipeline.lock(repo.name, release.version):
+        if release.is_prebuilt:
+            jar_path = await pipeline.download.run(
+                download_release_jar, suffix_priority, settings, repo, release
+            )
+        else:
+            jar_path = await pipeline.build.run(
+                build_release_jar, suffix_priority, main_address, settings, repo, release
+            )
+        if jar_path is None:
+            return None
+        return await get_from_release(
+            pipeline, main_address, jar_path, settings, repo, release
         )
-    ]
 
 
-def get_meta_from_releases(
-    base_address: str,
-    jarpaths: list[tuple[datacls.Release, str]],
+async def get_versions_from_releases(
+    pipeline: pipelines.Pipeline,
+    suffix_priority: list[str],
+    main_address: str,
     settings: datacls.ModSettings,
     repo: datacls.Repo,
-) -> list[RMod]:
-
-    return [
-        get_from_release(base_address, jar_path, settings, repo, release)
-        for release, jar_path in jarpaths
-        if jar_path is not None
-    ]
+    releases: list[datacls.Release],
+) -> list[Optional[RMod]]:
+    return await pipelines.gather(
+        *(
+            get_version_from_release(
+                pipeline, suffix_priority, main_address, settings, repo, release
+            )
+            for release in releases
+        )
+    )
 
 
 def filter_versions(versions: list[RMod], settings: datacls.ModSettings) -> list[RMod]:
     """
 
-    :param versions: list[RMod]:
-    :param settings: datacls.ModSettings:
     :param versions: list[RMod]:
     :param settings: datacls.ModSettings:
 
     """
-    added_versions: list[RMod] = []
+    index = VersionIndex()
     for version in versions:
         if not version:
             continue
-        if version.version not in added_versions:
-            added_versions.append(version)
-        else:
+        if dropped := index.add(version):
             logger.warning(
-                f"[{settings.repo}] Skipping duplicate {version.version} because it has duplicate versions."
+                f"[{settings.repo}] Skipping duplicate {dropped.version} because a newer release has the same version."
             )
-    versions_sorted: list[RMod] = sorted(
-        added_versions,
-        key=lambda version: (
-            not version.ext.prerelease,
-            version.ext.published_at,
-        ),
-        reverse=True,
-    )
-
-    return versions_sorted
+    return index.ordered()
 
 
-def get_mod(
-    suffix_priority: list[str], main_address: str, settings: datacls.ModSettings
-) -> RMod:
+async def get_metadata(
+    settings: datacls.ModSettings,
+) -> tuple[datacls.Repo, list[datacls.Release]]:
     logger.info(f"[{settings.repo}] Loading Metadata...")
     provider = providers.map[settings.provider]
 
-    repo = provider.get_repo(settings)
-    releases = provider.get_releases(settings, repo)
+    with REPORT.stage("metadata", settings.repo):
+        repo = await provider.get_repo(settings)
+        if settings.dev_builds == True:
+            releases, dev_release = await asyncio.gather(
+                provider.get_releases(settings, repo),
+                provider.get_latest_commit_as_release(settings, repo),
+            )
+            releases.append(dev_release)
+        else:
+            releases = await provider.get_releases(settings, repo)
     logger.success(f"[{settings.repo}] Metadata loaded.")
-    if settings.dev_builds == True:
-        releases.append(provider.get_latest_commit_as_release(settings, repo))
-    if not releases:
-        logger.warning(
-            f"[{settings.repo}] Skipping because it doesn't have any releases."
-        )
-        return None
-    jarpaths = get_jars_from_releases(
-        suffix_priority, main_address, settings, repo, releases
-    )
-    versions_unfiltered = get_meta_from_releases(main_address, jarpaths, settings, repo)
+    return repo, releases
+
+
+def finalize_mod(
+    versions_unfiltered: list[Optional[RMod]], settings: datacls.ModSettings
+) -> Optional[RMod]:
     filtered_versions = filter_versions(versions_unfiltered, settings)
 
     versions = list(filtered_versions)
@@ -300,24 +353,188 @@ def get_mod(
     return mod
 
 
-def generate_repo(setts):
-    logger.info("Loading Mods...")
-    mods = [
-        mod
-        for mod in [
-            get_mod(
-                sorted(
-                    enumerate(setts["suffixPrios"]),
-                    key=lambda x: len(x[1]),
-                    reverse=True,
+def missing_files(main_address: str, mod: dict) -> list[str]:
+    """The files served from the repo, like builds and icons, a generated mod points to but that don't exist.
+
+    :param main_address: the address the repo is served from
+    :param mod: the mod, or a version of it
+
+    """
+    paths = dict.fromkeys(
+        url.removeprefix(main_address)
+        for url in get_mod_urls(mod)
+        if url.startswith(main_address)
+    )
+    return [path for path in paths if not os.path.isfile(path)]
+
+
+def reuse_mod(mod: dict) -> RMod:
+    """Load a previously generated mod.
+
+    :param mod: the previous output of the mod
+
+    """
+    return intern_strings(RMod.from_dict(mod))
+
+
+def get_previous_mod(main_address: str, settings: datacls.ModSettings) -> Optional[RMod]:
+    previous = PREVIOUS.get(settings)
+    if previous is None:
+        logger.error(
+            f"[{settings.repo}] Skipping because it couldn't be loaded and there is no previous output."
+        )
+        return None
+    logger.info(f"[{settings.repo}] Reusing the previous output.")
+    if missing := missing_files(main_address, previous):
+        logger.warning(
+            f"[{settings.repo}] The previous output links to files that don't exist anymore: "
+            + ", ".join(missing)
+        )
+    PREVIOUS.reused += 1
+    return reuse_mod(previous)
+
+
+async def get_fingerprint(
+    suffix_priority: list[str], main_address: str, settings: datacls.ModSettings
+) -> Optional[str]:
+    provider = providers.map[settings.provider]
+    if not hasattr(provider, "fingerprint"):
+        return None
+    with REPORT.stage("fingerprint", settings.repo):
+        return PARSE_MEMO.context(
+            parsers.PARSER_VERSION,
+            main_address,
+            suffix_priority,
+            settings.to_dict(),
+            await provider.fingerprint(settings),
+        )
+
+
+async def get_mod(
+    pipeline: pipelines.Pipeline,
+    suffix_priority: list[str],
+    main_address: str,
+    settings: datacls.ModSettings,
+) -> Optional[RMod]:
+    try:
+        fingerprint = await pipeline.metadata.run(
+            get_fingerprint, suffix_priority, main_address, settings
+        )
+        unchanged = fingerprint and PREVIOUS.get_unchanged(settings, fingerprint)
+        if unchanged and (missing := missing_files(main_address, unchanged)):
+            logger.info(
+                f"[{settings.repo}] Unchanged since the last run, but loading it again, as the previous output links to files that don't exist anymore: "
+                + ", ".join(missing)
+            )
+        elif unchanged:
+            logger.success(
+                f"[{settings.repo}] Unchanged since the last run, reusing the previous output."
+            )
+            return reuse_mod(unchanged)
+        repo, releases = await pipeline.metadata.run(get_metadata, settings)
+    except RateLimitExceeded as e:
+        logger.warning(f"[{settings.repo}] {e}.")
+        return get_previous_mod(main_address, settings)
+    if not releases:
+        logger.warning(
+            f"[{settings.repo}] Skipping because it doesn't have any releases."
+        )
+        return None
+    versions_unfiltered = await get_versions_from_releases(
+        pipeline, suffix_priority, main_address, settings, repo, releases
+    )
+    mod = await pipeline.finalize.run(finalize_mod, versions_unfiltered, settings)
+    if mod:
+        PREVIOUS.put(settings, mod.to_dict(), fingerprint)
+    return mod
+
+
+async def prefetch_metadata(mod_settings: list[datacls.ModSettings]):
+    by_provider = {}
+    for settings in mod_settings:
+        provider = providers.map[settings.provider]
+        if hasattr(provider, "prefetch"):
+            by_provider.setdefault(provider, []).append(settings)
+    await asyncio.gather(
+        *(provider.prefetch(settings) for provider, settings in by_provider.items())
+    )
+
+
+def get_mod_urls(mod: dict) -> list[str]:
+    urls = []
+    for version in [mod, *(mod["ext"].get("alt_versions") or [])]:
+        urls.append(version["url"])
+        urls.extend(url for _, url in version["ext"].get("alt_download") or [])
+        if version["ext"].get("icon"):
+            urls.append(version["ext"]["icon"])
+    return urls
+
+
+def get_urls(file_content: dict) -> list[str]:
+    return [url for mod in file_content["mods"] for url in get_mod_urls(mod)]
+
+
+async def generate_repo(
+    setts,
+    workers: Optional[dict[str, int]] = None,
+    mods: Optional[list[Optional[RMod]]] = None,
+    only: Optional[list[int]] = None,
+) -> list[str]:
+    """Generate the repo files.
+
+    :param setts: the settings
+    :param workers: worker counts of the pipeline stages, overriding the settings
+    :param mods: the mods loaded by an earlier call, in the order of the settings. Updated in place.
+    :param only: indices of the mods to load again, all by default. The others are taken from ``mods``.
+    :returns: the files to serve: the repo files and the builds and icons they link to
+
+    """
+    pipeline = pipelines.Pipeline({**setts.get("workers", {}), **(workers or {})})
+    logger.info(
+        "Loading Mods... (workers: "
+        + ", ".join(f"{name}={count}" for name, count in pipeline.workers.items())
+        + ")"
+    )
+    suffix_priority = sorted(
+        enumerate(setts["suffixPrios"]),
+        key=lambda x: len(x[1]),
+        reverse=True,
+    )
+    mod_settings = [datacls.ModSettings.from_dict(mod) for mod in setts["mods"]]
+    if mods is None:
+        mods = [None] * len(mod_settings)
+    PREVIOUS.max_age = setts.get("changeDetectionMaxAge", PREVIOUS.max_age)
+    GRADLE.timeout = setts.get("buildTimeout", GRADLE.timeout)
+    if only is None:
+        only = list(range(len(mod_settings)))
+        GRADLE.clear_logs()
+        PREVIOUS.prune(mod_settings)
+    to_load = [mod_settings[i] for i in only]
+    await prefetch_metadata(to_load)
+    scheduled, deferred = await schedule(to_load)
+    if deferred:
+        logger.warning(
+            f"Rate limit budget is low, reusing the previous output of {len(deferred)} mods: "
+            + ", ".join(settings.repo for settings in deferred)
+        )
+    with jars.process_pool(pipeline.workers["parse"]) as pipeline.parse.executor:
+        loaded = dict(
+            zip(
+                map(id, scheduled),
+                await pipeline.map(
+                    lambda settings: get_mod(
+                        pipeline, suffix_priority, setts["address"], settings
+                    ),
+                    scheduled,
                 ),
-                setts["address"],
-                datacls.ModSettings.from_dict(mod),
             )
-            for mod in setts["mods"]
-        ]
-        if mod
-    ]
+        )
+    for i, settings in zip(only, to_load):
+        mods[i] = (
+            loaded[id(settings)]
+            if id(settings) in loaded
+            else get_previous_mod(setts["address"], settings)
+        )
 
     logger.info("Generating output content...")
     file_content = {
@@ -325,28 +542,37 @@ def generate_repo(setts):
         "specVersion": 2,
         "lastUpdated": round(time.time() * 1000),
         "rootId": setts["rootId"],
-        "mods": [mod.to_dict() for mod in mods],
+        "mods": [mod.to_dict() for mod in mods if mod],
     }
 
     logger.info("Writing output files...")
-    with open("repo.json", "w", encoding="utf-8") as f:
-        json.dump(
-            file_content,
-            f,
-            indent=4,
-        )
+    await write_outputs("repo", file_content)
+    if setts.get("shardedOutput", False):
+        logger.info("Writing sharded output files...")
+        await SHARDS.write("repo", file_content, setts["address"])
+        logger.info(f"Shards: {SHARDS.stats()}.")
+
+    served = [
+        url.removeprefix(setts["address"])
+        for url in get_urls(file_content)
+        if url.startswith(setts["address"])
+    ]
+    ARTIFACTS.prune(served + BUILD_CACHE.paths())
+    ICONS.prune(served)
 
-    with open("repo.hjson", "w", encoding="utf-8") as f:
-        hjson.dump(
-            file_content,
-            f,
-            indent=4,
-        )
+    DELTA_FEED.history = setts.get("deltaHistory", DELTA_FEED.history)
+    delta_feed = DELTA_FEED.update(file_content)
+    if delta_feed:
+        await write_outputs("repo.delta", delta_feed)
 
     logger.success("Generated repo.")
+    served += output_paths("repo") + output_paths("repo.delta")
+    if setts.get("shardedOutput", False):
+        served += SHARDS.paths("repo")
+    return served
 
 
-def generate_repo_mapping(repos):
+async def generate_repo_mapping(repos):
     """
 
     :param repos:
@@ -357,15 +583,12 @@ def generate_repo_mapping(repos):
     repo_results = {}
     repo_map = {}
     mods = {}
-    for repo_address in repos:
-        logger.info(f"[{repo_address}] Loading metadata...")
-        try:
-            resp = requests.get(repo_address, timeout=10)
-            res = hjson.loads(resp.text)
-        except Exception as e:
-            logger.error(f"[{repo_address}] Failed to load metadata: {e}")
+    logger.info(f"Loading metadata of {len(repos)} repos...")
+    for repo_address, res in zip(repos, await REMOTE_REPOS.load_all(repos)):
+        if isinstance(res, Exception):
+            logger.error(f"[{repo_address}] Failed to load metadata: {res}")
             continue
-        if "rootId" not in res:
+        if not res["hasRootId"]:
             logger.warning(
                 f"[{repo_address}] Skipping because it doesn't have a rootId."
             )
@@ -374,11 +597,12 @@ def generate_repo_mapping(repos):
         if not repo_id:
             logger.warning(f"[{repo_address}] Skipping because rootId is empty.")
             continue
-        if "mods" not in res:
+        if res["mods"] is None:
             logger.warning(f"[{repo_id}] Skipping because it doesn't have mods.")
             continue
         repo_map[repo_id] = repo_address
         repo_results[repo_id] = res["mods"]
+    logger.info(f"Repo files: {REMOTE_REPOS.stats()}.")
 
     repo_results = {
         k: v
@@ -389,15 +613,15 @@ def generate_repo_mapping(repos):
 
     for repo_id, repo_mods in repo_results.items():
         logger.info(f"[{repo_id}] Processing mods...")
-        for mod in repo_mods:
-            if "id" not in mod:
+        for mod_id in repo_mods:
+            if mod_id is None:
                 logger.warning(
                     f"[{repo_id}] Skipping MOD because mod doesn't have an id."
                 )
                 continue
-            if mod["id"] not in mods:
-                mods[mod["id"]] = []
-            mods[mod["id"]].append(repo_id)
+            if mod_id not in mods:
+                mods[mod_id] = []
+            mods[mod_id].append(repo_id)
 
     logger.info("Generating output content...")
 
@@ -408,30 +632,204 @@ def generate_repo_mapping(repos):
     }
 
     logger.info("Writing output files...")
+    await write_outputs("repo_mapping", output_content)
 
-    with open("repo_mapping.json", "w", encoding="utf-8") as f:
-        json.dump(
-            output_content,
-            f,
-            indent=4,
-        )
+    logger.success("Generated repo mapping.")
 
-    with open("repo_mapping.hjson", "w", encoding="utf-8") as f:
-        hjson.dump(
-            output_content,
-            f,
-            indent=4,
-        )
 
-    logger.success("Generated repo mapping.")
+def save_state():
+    """Save the caches and write the run report."""
+    SESSIONS.cache.save()
+    PARSE_MEMO.save()
+    BUILD_CACHE.save()
+    PREVIOUS.save()
+    logger.info(f"HTTP cache: {SESSIONS.cache.stats()}.")
+    logger.info(f"Parse memo: {PARSE_MEMO.stats()}.")
+    logger.info(f"Build cache: {BUILD_CACHE.stats()}.")
+    logger.info(f"Gradle: {GRADLE.stats()}.")
+    logger.info(f"Previous outputs: {PREVIOUS.stats()}.")
+    logger.info(f"GitHub rate limit: {providers.github.CORE_LIMITER.stats()}.")
+    REPORT.extra.update(
+        http=SESSIONS.cache.stats(),
+        parse_memo=PARSE_MEMO.stats(),
+        build_cache=BUILD_CACHE.stats(),
+        gradle=GRADLE.stats(),
+        previous=PREVIOUS.stats(),
+        github_rate_limit=providers.github.CORE_LIMITER.stats(),
+    )
+    REPORT.write("run-report.json", "run-report.prom")
+    logger.info("Wrote run-report.json and run-report.prom.")
+
+
+def collect_caches(setts):
+    """Keep the cache directory and the gradle user home within their budgets.
+
+    :param setts: the settings
+
+    """
+    budget = setts.get("cacheBytes", DEFAULT_CACHE_BUDGET)
+    logger.info(CACHE_MANAGER.report(CACHE_MANAGER.collect(budget), budget))
+    budget = setts.get("gradleCacheBytes", DEFAULT_GRADLE_BUDGET)
+    logger.info(
+        f"Gradle user home: {GRADLE.collect(budget) / 2**20:.1f} MiB of {budget / 2**20:.1f} MiB."
+    )
+
+
+async def run(setts, workers: Optional[dict[str, int]] = None):
+    if "httpCacheBytes" in setts:
+        SESSIONS.cache.max_bytes = setts["httpCacheBytes"]
+    try:
+        served = await generate_repo(setts, workers)
+        await generate_repo_mapping(setts["repos"])
+        SITE.publish(served + output_paths("repo_mapping"))
+        collect_caches(setts)
+    finally:
+        await SESSIONS.close()
+        save_state()
+
+
+async def serve(
+    setts, workers: Optional[dict[str, int]] = None, host: str = "127.0.0.1", port: int = 8080
+):
+    """Keep running, regenerating the mods a webhook reports a change of.
+
+    Everything is regenerated at the start and every ``reconcileInterval`` seconds, in case a
+    webhook was missed. Webhooks arriving within ``webhookDebounce`` seconds are handled together.
+
+    :param setts: the settings
+    :param workers: worker counts of the pipeline stages, overriding the settings
+    :param host: the address to listen on for webhooks
+    :param port: the port to listen on for webhooks
+
+    """
+    if "httpCacheBytes" in setts:
+        SESSIONS.cache.max_bytes = setts["httpCacheBytes"]
+    mod_settings = [datacls.ModSettings.from_dict(mod) for mod in setts["mods"]]
+    mods: list[Optional[RMod]] = [None] * len(mod_settings)
+    pending: set[int] = set()
+    wake = asyncio.Event()
+    secret = os.environ.get("WEBHOOK_SECRET")
+    if not secret:
+        logger.warning("WEBHOOK_SECRET is not set, webhooks are not verified.")
+
+    async def handle(request: web.Request) -> web.Response:
+        body = await request.read()
+        if secret and not webhooks.verify(secret, request.headers, body):
+            return web.Response(status=401, text="Invalid signature")
+        try:
+            event = webhooks.parse(request.headers, webhooks.load(request.headers, body))
+        except ValueError as e:
+            return web.Response(status=400, text=f"Invalid payload: {e}")
+        affected = [
+            i
+            for i, settings in enumerate(mod_settings)
+            if event and webhooks.affects(event, settings)
+        ]
+        if affected:
+            logger.info(
+                f"Webhook: {event.event} in {event.repo}, regenerating "
+                + ", ".join(mod_settings[i].repo for i in affected)
+            )
+            pending.update(affected)
+            wake.set()
+        return web.json_response({"mods": [mod_settings[i].repo for i in affected]})
+
+    app = web.Application()
+    app.router.add_post("/webhook", handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f"Listening for webhooks on http://{host}:{port}/webhook")
+    reconcile_interval = setts.get("reconcileInterval", 6 * 60 * 60)
+    next_reconcile = time.monotonic()
+    # Until everything was loaded once, mods only loaded partially must not be written
+    reconciled = False
+    try:
+        while True:
+            if time.monotonic() >= next_reconcile:
+                only = None
+                pending.clear()
+                # Only what this reconciliation uses is kept from eviction
+                TMP_DIRS.touched.clear()
+                next_reconcile = time.monotonic() + reconcile_interval
+            else:
+                try:
+                    await asyncio.wait_for(
+                        wake.wait(), next_reconcile - time.monotonic()
+                    )
+                except TimeoutError:
+                    continue
+                await asyncio.sleep(setts.get("webhookDebounce", 10))
+                wake.clear()
+                only = sorted(pending) if reconciled else None
+                pending.clear()
+            try:
+                served = await generate_repo(setts, workers, mods, only)
+                if only is None:
+                    await generate_repo_mapping(setts["repos"])
+                    collect_caches(setts)
+                    reconciled = True
+                SITE.publish(served + output_paths("repo_mapping"))
+            except Exception:
+                logger.exception("Failed to regenerate the repo.")
+                if only is None:
+                    next_reconcile = time.monotonic() + 60
+            finally:
+                save_state()
+                REPORT.reset()
+    finally:
+        await runner.cleanup()
+        await SESSIONS.close()
+
+
+def parse_worker_count(value: str) -> tuple[str, int]:
+    """
+
+    :param value: str: like "build=2"
+
+    """
+    stage, sep, count = value.partition("=")
+    if (
+        not sep
+        or stage not in pipelines.DEFAULT_WORKERS
+        or not count.isdigit()
+        or int(count) < 1
+    ):
+        raise argparse.ArgumentTypeError(
+            f"expected STAGE=COUNT with STAGE one of {', '.join(pipelines.DEFAULT_WORKERS)} and COUNT at least 1, got {value!r}"
+        )
+    return stage, int(count)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate the CRM-1 repository.")
+    parser.add_argument(
+        "--workers",
+        metavar="STAGE=COUNT",
+        type=parse_worker_count,
+        action="append",
+        default=[],
+        help="Number of workers for a pipeline stage. Can be given once per stage. Overrides settings.json.",
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Keep running and regenerate mods when a GitHub or Forgejo webhook reports a release or push.",
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on for webhooks.")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on for webhooks.")
+    return parser.parse_args()
 
 
 @entrypoint
 def main():
     start = time.time()
+    args = parse_args()
     logger.info("Reading config...")
     with open("settings.json", "r", encoding="utf-8") as f:
         setts = json.load(f)
-    generate_repo(setts)
-    generate_repo_mapping(setts["repos"])
+    if args.daemon:
+        asyncio.run(serve(setts, dict(args.workers), args.host, args.port))
+    else:
+        asyncio.run(run(setts, dict(args.workers)))
     logger.success(f"Finished. Took {time.time() - start:.2f}s.")
@@ -0,0 +1,4 @@
+import os
+
+# The github provider reads its token when imported
+os.environ.setdefault("GITHUB_TOKEN", "test")
@@ -0,0 +1,66 @@
+from utils.delta import DeltaFeed, diff
+
+
+def version(name: str, url: str = None) -> dict:
+    # Like written to the repo file: every version is a full mod without older versions
+    return {
+        "version": name,
+        "url": url or f"https://example.org/{name}.jar",
+        "ext": {"alt_versions": []},
+    }
+
+
+def mod(mod_id: str, *versions: dict) -> dict:
+    latest, *older = [{**v, "id": mod_id} for v in versions]
+    return {**latest, "ext": {**latest["ext"], "alt_versions": older}}
+
+
+def catalog(updated: int, *mods: dict) -> dict:
+    return {"rootId": "root", "lastUpdated": updated, "mods": list(mods)}
+
+
+def test_added_and_removed_mods():
+    old = catalog(1, mod("a", version("1.0.0")), mod("b", version("1.0.0")))
+    new = catalog(2, mod("a", version("1.0.0")), mod("c", version("1.0.0")))
+    delta = diff(old, new)
+    assert delta["from"] == 1 and delta["to"] == 2
+    assert [m["id"] for m in delta["added"]] == ["c"]
+    assert delta["removed"] == ["b"]
+    assert delta["changed"] == []
+
+
+def test_changed_mod():
+    old = catalog(1, mod("a", version("1.1.0"), version("1.0.0"), version("0.9.0")))
+    new = catalog(
+        2,
+        mod("a", version("2.0.0"), version("1.1.0"), version("1.0.0", "https://example.org/moved.jar")),
+    )
+    (changed,) = diff(old, new)["changed"]
+    assert changed["id"] == "a"
+    assert changed["versions"] == ["2.0.0", "1.1.0", "1.0.0"]
+    # The former latest version is compared without its alt_versions, so it is unchanged
+    assert [v["version"] for v in changed["upsert"]] == ["2.0.0", "1.0.0"]
+    assert changed["upsert"][0]["ext"]["alt_versions"] == []
+    assert changed["remove"] == ["0.9.0"]
+
+
+def test_unchanged():
+    content = catalog(1, mod("a", version("1.0.0")))
+    assert diff(content, {**content, "lastUpdated": 2})["changed"] == []
+
+
+def test_feed(tmp_path):
+    feed = DeltaFeed(str(tmp_path / "delta.json"), history=2)
+    assert feed.update(catalog(1, mod("a", version("1.0.0")))) is None
+    feed.update(catalog(2, mod("a", version("1.1.0"))))
+    feed.update(catalog(3, mod("a", version("1.2.0"))))
+    result = feed.update(catalog(4, mod("a", version("1.3.0"))))
+    assert result["lastUpdated"] == 4
+    assert [(d["from"], d["to"]) for d in result["deltas"]] == [(2, 3), (3, 4)]
+    assert result["oldest"] == 2
+
+
+def test_feed_restarts_on_new_root(tmp_path):
+    feed = DeltaFeed(str(tmp_path / "delta.json"))
+    feed.update(catalog(1, mod("a", version("1.0.0"))))
+    assert feed.update({**catalog(2, mod("a", version("1.1.0"))), "rootId": "other"}) is None
@@ -0,0 +1,122 @@
+import asyncio
+import json
+import socket
+
+import pytest
+from aiohttp import web
+
+from utils.download import DownloadManager
+from utils.http import SessionPool
+
+DATA = bytes(range(256)) * 400
+
+
+class Server:
+    """Serves one file, honouring Range only if If-Range matches its ETag."""
+
+    def __init__(self, data: bytes, etag: str = '"v1"'):
+        self.data = data
+        self.etag = etag
+        self.status = 200
+        self.requests: list[tuple] = []
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/file.jar"
+
+    async def handle(self, request: web.Request) -> web.Response:
+        range_, if_range = request.headers.get("Range"), request.headers.get("If-Range")
+        self.requests.append((range_, if_range))
+        if self.status != 200:
+            return web.Response(status=self.status)
+        headers = {"ETag": self.etag}
+        if range_ and if_range == self.etag:
+            start = int(range_.removeprefix("bytes=").removesuffix("-"))
+            return web.Response(status=206, body=self.data[start:], headers=headers)
+        return web.Response(body=self.data, headers=headers)
+
+
+def download(server: Server, path, retries: int = 0):
+    async def run():
+        app = web.Application()
+        app.router.add_get("/file.jar", server.handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", server.port).start()
+        manager = DownloadManager(SessionPool(), retries=retries, backoff=0)
+        try:
+            return await manager.download(server.url, path)
+        finally:
+            await manager.sessions.close()
+            await runner.cleanup()
+
+    return asyncio.run(run())
+
+
+def write_part(path, data: bytes, validator, url=None):
+    part = path.with_name(path.name + ".part")
+    part.write_bytes(data)
+    if validator is not None:
+        meta = {"url": url, "validator": validator}
+        part.with_name(part.name + ".json").write_text(json.dumps(meta))
+
+
+def test_download(tmp_path):
+    server = Server(DATA)
+    path = download(server, tmp_path / "file.jar")
+    assert path.read_bytes() == DATA
+    assert not (tmp_path / "file.jar.part").exists()
+    assert server.requests == [(None, None)]
+
+
+def test_finished_download_reused(tmp_path):
+    server = Server(DATA)
+    path = download(server, tmp_path / "file.jar")
+    server.data = b"changed"
+    assert download(server, path).read_bytes() == DATA
+    assert len(server.requests) == 1
+
+
+def test_file_without_record_downloaded_again(tmp_path):
+    # Like a truncated jar from before downloads were recorded
+    path = tmp_path / "file.jar"
+    path.write_bytes(DATA[:10])
+    server = Server(DATA)
+    assert download(server, path).read_bytes() == DATA
+    assert server.requests == [(None, None)]
+
+
+def test_resume(tmp_path):
+    path = tmp_path / "file.jar"
+    server = Server(DATA)
+    write_part(path, DATA[:1000], '"v1"', server.url)
+    assert download(server, path).read_bytes() == DATA
+    assert server.requests == [("bytes=1000-", '"v1"')]
+
+
+def test_resume_after_change_restarts(tmp_path):
+    path = tmp_path / "file.jar"
+    server = Server(b"new content", etag='"v2"')
+    write_part(path, DATA[:1000], '"v1"', server.url)
+    assert download(server, path).read_bytes() == b"new content"
+    assert server.requests == [("bytes=1000-", '"v1"')]
+
+
+def test_part_without_validator_restarts(tmp_path):
+    path = tmp_path / "file.jar"
+    write_part(path, b"garbage", None)
+    server = Server(DATA)
+    assert download(server, path).read_bytes() == DATA
+    assert server.requests == [(None, None)]
+
+
+def test_client_error_not_retried(tmp_path):
+    server = Server(DATA)
+    server.status = 404
+    with pytest.raises(Exception) as info:
+        download(server, tmp_path / "file.jar", retries=3)
+    assert getattr(info.value, "status", None) == 404
+    assert len(server.requests) == 1
@@ -0,0 +1,104 @@
+import random
+
+import pytest
+from crm1.spec.v2 import RMod
+
+from utils.versions import VersionIndex, normalize_version, precedence
+
+
+def mod(version: str, published_at: int = 0, prerelease: bool = False) -> RMod:
+    return RMod.from_dict(
+        {
+            "id": "mod",
+            "name": "mod",
+            "desc": "",
+            "authors": [],
+            "version": version,
+            "gameVersion": "[0.1.0,)",
+            "url": f"https://example.org/mod-{version}.jar",
+            "deps": [],
+            "ext": {"published_at": published_at, "prerelease": prerelease},
+        }
+    )
+
+
+def ordered(versions: list[str]) -> list[str]:
+    mods = [mod(version) for version in versions]
+    random.Random(0).shuffle(mods)
+    return [m.version for m in sorted(mods, key=precedence)]
+
+
+def test_release_above_its_prereleases():
+    assert ordered(["1.0.0", "1.0.0-beta", "0.9.0", "1.0.1-alpha"]) == [
+        "0.9.0",
+        "1.0.0-beta",
+        "1.0.0",
+        "1.0.1-alpha",
+    ]
+
+
+def test_numbers_compared_numerically():
+    assert ordered(["1.10.0", "1.9.0", "1.2.0"]) == ["1.2.0", "1.9.0", "1.10.0"]
+
+
+def test_prerelease_tags():
+    # Numeric tags are compared as numbers and below alphanumeric ones
+    assert ordered(
+        ["1.0.0-beta.11", "1.0.0-beta.2", "1.0.0-alpha", "1.0.0-1", "1.0.0-alpha.1", "1.0.0-rc"]
+    ) == [
+        "1.0.0-1",
+        "1.0.0-alpha",
+        "1.0.0-alpha.1",
+        "1.0.0-beta.2",
+        "1.0.0-beta.11",
+        "1.0.0-rc",
+    ]
+
+
+def test_non_semantic_versions_highest():
+    assert ordered(["dev", "2.0.0", "1.0.0-beta"]) == ["1.0.0-beta", "2.0.0", "dev"]
+
+
+def test_ties_broken_by_publish_time():
+    older, newer = mod("not semver", 1), mod("also not", 2)
+    assert sorted([newer, older], key=precedence) == [older, newer]
+
+
+@pytest.mark.parametrize(
+    "version, normalized",
+    [("1.0", "1.0.0"), ("v1.0.0", "1.0.0"), (" V1.0.0 ", "1.0.0"), ("Dev", "dev")],
+)
+def test_normalize_version(version, normalized):
+    assert normalize_version(version) == normalized
+
+
+def test_index_keeps_later_duplicate():
+    index = VersionIndex()
+    first, later = mod("1.0", 1), mod("v1.0.0", 2)
+    assert index.add(first) is None
+    assert index.add(later) is first
+    assert index.add(mod("1.0.0", 0)).version == "1.0.0"
+    assert len(index) == 1
+    assert index.stable == [later]
+
+
+def test_index_channels():
+    index = VersionIndex()
+    for m in [
+        mod("1.0.0", 1),
+        mod("2.0.0-beta", 3, prerelease=True),
+        mod("dev", 4, prerelease=True),
+        mod("1.1.0", 2),
+        mod("1.1.0-rc.1", 2, prerelease=True),
+    ]:
+        index.add(m)
+    assert [m.version for m in index.stable] == ["1.1.0", "1.0.0"]
+    # Dev builds rank highest in the prerelease channel
+    assert [m.version for m in index.prerelease] == ["dev", "2.0.0-beta", "1.1.0-rc.1"]
+    assert [m.version for m in index.ordered()] == [
+        "1.1.0",
+        "1.0.0",
+        "dev",
+        "2.0.0-beta",
+        "1.1.0-rc.1",
+    ]
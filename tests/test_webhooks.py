@@ -0,0 +1,113 @@
+import hashlib
+import hmac
+import json
+from urllib.parse import urlencode
+
+import pytest
+
+from utils import datacls, webhooks
+
+PAYLOAD = {
+    "ref": "refs/heads/main",
+    "repository": {
+        "full_name": "CRModders/Kosmic",
+        "html_url": "https://codeberg.org/CRModders/Kosmic",
+        "default_branch": "main",
+    },
+}
+
+
+def sign(secret: str, body: bytes) -> str:
+    return hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+
+
+def event(provider="github", name="release", repo="CRModders/Kosmic", host="github.com", ref=None):
+    return webhooks.WebhookEvent(provider, name, repo, host, ref, "main")
+
+
+def test_verify_github():
+    body = b'{"a": 1}'
+    headers = {"X-Hub-Signature-256": "sha256=" + sign("secret", body)}
+    assert webhooks.verify("secret", headers, body)
+    assert not webhooks.verify("other", headers, body)
+    assert not webhooks.verify("secret", headers, body + b" ")
+
+
+def test_verify_forgejo():
+    body = b'{"a": 1}'
+    assert webhooks.verify("secret", {"X-Forgejo-Signature": sign("secret", body)}, body)
+    assert webhooks.verify("secret", {"X-Gitea-Signature": sign("secret", body)}, body)
+
+
+def test_verify_unsigned():
+    assert not webhooks.verify("secret", {}, b"{}")
+
+
+def test_load_json():
+    body = json.dumps(PAYLOAD).encode("utf-8")
+    assert webhooks.load({"Content-Type": "application/json"}, body) == PAYLOAD
+
+
+def test_load_form():
+    body = urlencode({"payload": json.dumps(PAYLOAD)}).encode("utf-8")
+    headers = {"Content-Type": "application/x-www-form-urlencoded; charset=utf-8"}
+    assert webhooks.load(headers, body) == PAYLOAD
+
+
+@pytest.mark.parametrize(
+    "headers, body",
+    [
+        ({"Content-Type": "application/json"}, b"[1, 2]"),
+        ({"Content-Type": "application/json"}, b"not json"),
+        ({"Content-Type": "application/x-www-form-urlencoded"}, b"other=1"),
+    ],
+)
+def test_load_invalid(headers, body):
+    with pytest.raises(ValueError):
+        webhooks.load(headers, body)
+
+
+def test_parse_github():
+    parsed = webhooks.parse({"X-GitHub-Event": "push"}, PAYLOAD)
+    assert parsed == webhooks.WebhookEvent(
+        "github", "push", "CRModders/Kosmic", "codeberg.org", "refs/heads/main", "main"
+    )
+
+
+@pytest.mark.parametrize("header", ["X-Forgejo-Event", "X-Gitea-Event"])
+def test_parse_forgejo_before_github(header):
+    # Forgejo sends X-GitHub-Event as well
+    parsed = webhooks.parse({header: "release", "X-GitHub-Event": "release"}, PAYLOAD)
+    assert parsed.provider == "forgejo"
+    assert parsed.event == "release"
+
+
+def test_parse_unknown():
+    assert webhooks.parse({}, PAYLOAD) is None
+    assert webhooks.parse({"X-GitHub-Event": "ping"}, {"zen": "..."}) is None
+
+
+def test_affects_github():
+    settings = datacls.ModSettings("github", "crmodders/kosmic")
+    assert webhooks.affects(event(), settings)
+    assert not webhooks.affects(event(repo="CRModders/Other"), settings)
+    assert not webhooks.affects(event(provider="forgejo", host="codeberg.org"), settings)
+
+
+def test_affects_forgejo_instance():
+    codeberg = datacls.ModSettings("codeberg", "CRModders/Kosmic")
+    assert webhooks.affects(event(provider="forgejo", host="codeberg.org"), codeberg)
+    assert not webhooks.affects(event(provider="forgejo", host="git.example.org"), codeberg)
+    assert not webhooks.affects(event(), codeberg)
+    own = datacls.ModSettings("forgejo", "CRModders/Kosmic", instance="https://git.example.org")
+    assert webhooks.affects(event(provider="forgejo", host="git.example.org"), own)
+
+
+def test_affects_push():
+    settings = datacls.ModSettings("github", "CRModders/Kosmic")
+    dev = datacls.ModSettings("github", "CRModders/Kosmic", dev_builds=True)
+    push = event(name="push", ref="refs/heads/main")
+    assert not webhooks.affects(push, settings)
+    assert webhooks.affects(push, dev)
+    assert not webhooks.affects(event(name="push", ref="refs/heads/feature"), dev)
+    assert not webhooks.affects(event(name="issues"), dev)
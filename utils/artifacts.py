@@ -0,0 +1,48 @@
+import pathlib
+from typing import Iterable
+
+from loguru import logger
+
+from .utils import file_sha256, prune_unreferenced, write_atomic
+
+
+class ArtifactStore:
+    """Stores built jars by content, as ``<root>/<sha256>/<file name>``.
+
+    A jar that was built before is not stored again, so every unique jar has exactly one
+    path (and url), no matter how often it is built.
+    """
+
+    def __init__(self, root: str = "builds"):
+        self.root = pathlib.Path(root)
+
+    def add(self, file) -> str:
+        """Store a file, unless a file with the same content is stored already.
+
+        :param file: the file to store
+        :returns: the path of the stored file, relative to the working directory, with forward slashes
+
+        """
+        file = pathlib.Path(file)
+        directory = self.root / file_sha256(file)
+        existing = next(directory.iterdir(), None) if directory.is_dir() else None
+        if existing is not None:
+            return existing.as_posix()
+        path = directory / file.name
+        with open(file, "rb") as f:
+            write_atomic(path, f.read())
+        return path.as_posix()
+
+    def prune(self, referenced: Iterable[str]) -> list[pathlib.Path]:
+        """Delete every stored file that isn't referenced anymore.
+
+        :param referenced: paths of the files that are still in use, as returned by ``add``
+        :returns: the deleted files
+
+        """
+        kept, pruned = prune_unreferenced(self.root, referenced)
+        logger.info(f"Artifacts: {kept} referenced, {len(pruned)} pruned.")
+        return pruned
+
+
+ARTIFACTS = ArtifactStore()
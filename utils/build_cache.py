@@ -0,0 +1,84 @@
+import os
+import time
+from typing import Optional
+
+from .store import JsonStore
+from .utils import TMP_DIRS
+
+DEFAULT_KEEP = 5
+
+
+class BuildCache:
+    """Remembers the artifacts built from a commit, so the same commit is never built twice.
+
+    Only the ``keep`` most recently used commits of each repository are remembered.
+    """
+
+    def __init__(self, *sub, keep: int = DEFAULT_KEEP):
+        self.store = JsonStore(TMP_DIRS.get_path_nc(*sub))
+        self.keep = keep
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, repo: str, sha: str) -> Optional[tuple[list[tuple[str, str]], str]]:
+        """Look up the build of a commit.
+
+        :param repo: full name of the repository
+        :param sha: the commit that was built
+        :returns: the attached files and the path of the primary jar, or None if the commit wasn't built
+            or its primary jar is gone
+
+        """
+        entry = self.store.data.get(repo, {}).get(sha)
+        if not entry or not os.path.exists(entry["jar_path"]):
+            self.misses += 1
+            return None
+        self.hits += 1
+        entry["accessed"] = time.time()
+        return [tuple(f) for f in entry["attached_files"]], entry["jar_path"]
+
+    def put(
+        self,
+        repo: str,
+        sha: str,
+        attached_files: list[tuple[str, str]],
+        jar_path: str,
+        paths: list[str],
+    ):
+        builds = self.store.data.setdefault(repo, {})
+        builds[sha] = {
+            "attached_files": attached_files,
+            "jar_path": jar_path,
+            "paths": paths,
+            "accessed": time.time(),
+        }
+        for old_sha, _ in sorted(builds.items(), key=lambda item: item[1]["accessed"])[
+            : -self.keep
+        ]:
+            del builds[old_sha]
+
+    def has_builds(self, repo: str) -> bool:
+        """Whether a commit of a repository was built before.
+
+        :param repo: full name of the repository
+
+        """
+        return bool(self.store.data.get(repo))
+
+    def paths(self) -> list[str]:
+        """Get the paths of all stored artifacts that remembered builds refer to."""
+        return [
+            path
+            for builds in self.store.data.values()
+            for entry in builds.values()
+            for path in entry.get("paths", [entry["jar_path"]])
+        ]
+
+    def save(self):
+        self.store.save()
+
+    def stats(self) -> str:
+        return f"{self.hits} hits, {self.misses} misses"
+
+
+BUILD_CACHE = BuildCache("builds.json")
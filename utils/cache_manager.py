@@ -0,0 +1,143 @@
+import os
+import shutil
+from typing import Iterator, NamedTuple
+
+from loguru import logger
+
+from .store import JsonStore
+from .utils import TMP_DIRS, TempDirProvider
+
+DEFAULT_BUDGET = 2 * 1024 * 1024 * 1024
+
+# The last part of the path of a cache entry (<owner>/<repo>/<version>/<kind>), and how it is reported
+KINDS = {
+    "build": "clone",
+    "download": "download",
+    # Legacy: jars aren't unzipped anymore, only kept so the ones of earlier runs get evicted
+    "unzipped": "unzipped",
+}
+
+
+class CacheEntry(NamedTuple):
+    sub: tuple[str, str, str, str]
+    kind: str
+    size: int
+    accessed: float
+
+
+def get_size(path) -> int:
+    """
+
+    :param path: a file or directory
+
+    """
+    if not os.path.isdir(path):
+        return os.lstat(path).st_size
+    size = 0
+    for root, _, files in os.walk(path):
+        for file in files:
+            try:
+                size += os.lstat(os.path.join(root, file)).st_size
+            except OSError:
+                pass
+    return size
+
+
+class CacheManager:
+    """Keeps the clones and downloads (and jars unzipped by earlier versions) in the cache directory within a byte budget.
+
+    Entries are evicted least recently used first. Entries used in the current run are never evicted.
+    The last access of each entry is kept in a json file, because atime is often not updated.
+    """
+
+    def __init__(self, provider: TempDirProvider, *sub):
+        self.provider = provider
+        self.access = JsonStore(self._path(*sub))
+        self.evicted: list[CacheEntry] = []
+
+    def _path(self, *sub) -> str:
+        return os.path.join(self.provider.parent, *sub)
+
+    def _key(self, sub: tuple[str]) -> str:
+        return "/".join(sub)
+
+    def entries(self) -> Iterator[CacheEntry]:
+        for touched, accessed in self.provider.touched.items():
+            if len(touched) == 4 and touched[3] in KINDS:
+                self.access.data[self._key(touched)] = accessed
+        parent = self.provider.parent
+        if not os.path.isdir(parent):
+            return
+        for owner in os.scandir(parent):
+            if not owner.is_dir():
+                continue
+            for repo in os.scandir(owner.path):
+                if not repo.is_dir():
+                    continue
+                for version in os.scandir(repo.path):
+                    if not version.is_dir():
+                        continue
+                    for kind in os.scandir(version.path):
+                        if kind.name not in KINDS or not kind.is_dir():
+                            continue
+                        sub = (owner.name, repo.name, version.name, kind.name)
+                        yield CacheEntry(
+                            sub,
+                            KINDS[kind.name],
+                            get_size(kind.path),
+                            self.access.data.get(self._key(sub), kind.stat().st_mtime),
+                        )
+
+    def _remove(self, entry: CacheEntry):
+        shutil.rmtree(self._path(*entry.sub), ignore_errors=True)
+        self.access.data.pop(self._key(entry.sub), None)
+        for depth in range(3, 0, -1):
+            try:
+                os.rmdir(self._path(*entry.sub[:depth]))
+            except OSError:
+                break
+
+    def collect(self, budget: int = DEFAULT_BUDGET) -> list[CacheEntry]:
+        """Evict the least recently used entries until the cache fits into ``budget`` bytes.
+
+        :param budget: the maximum size of all entries together
+        :returns: the remaining entries
+
+        """
+        entries = sorted(self.entries(), key=lambda entry: entry.accessed)
+        size = sum(entry.size for entry in entries)
+        remaining = []
+        for entry in entries:
+            if size > budget and entry.sub not in self.provider.touched:
+                logger.debug(f"Evicting {self._key(entry.sub)} from the cache.")
+                self._remove(entry)
+                self.evicted.append(entry)
+                size -= entry.size
+            else:
+                remaining.append(entry)
+        for key in list(self.access.data):
+            if not os.path.exists(self._path(*key.split("/"))):
+                del self.access.data[key]
+        self.access.save()
+        return remaining
+
+    def report(self, entries: list[CacheEntry], budget: int = DEFAULT_BUDGET) -> str:
+        """
+
+        :param entries: the entries returned by ``collect``
+        :param budget: the budget passed to ``collect``
+
+        """
+        lines = [f"Cache usage ({sum(e.size for e in entries) / 2**20:.1f} MiB of {budget / 2**20:.1f} MiB):"]
+        for kind in KINDS.values():
+            of_kind = [entry for entry in entries if entry.kind == kind]
+            lines.append(
+                f"  {kind}: {len(of_kind)} entries, {sum(e.size for e in of_kind) / 2**20:.1f} MiB"
+            )
+        lines.append(
+            f"  evicted: {len(self.evicted)} entries, {sum(e.size for e in self.evicted) / 2**20:.1f} MiB"
+        )
+        return "\n".join(lines)
+
+
+CACHE_MANAGER = CacheManager(TMP_DIRS, "access.json")
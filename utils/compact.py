@@ -0,0 +1,26 @@
+import sys
+from dataclasses import fields, is_dataclass
+from typing import Any
+
+
+def intern_strings(value: Any) -> Any:
+    """Intern every string of a parsed mod in place, including its older versions.
+
+    Owner, source, issue and changelog urls, loader and version ranges are repeated in every
+    version of a mod, and mods loaded from the memo or a previous output don't share them.
+
+    :param value: a dataclass instance (like an RMod), or a value of one of its fields
+
+    """
+    if isinstance(value, str):
+        return sys.intern(value)
+    if is_dataclass(value) and not isinstance(value, type):
+        for field in fields(value):
+            setattr(value, field.name, intern_strings(getattr(value, field.name)))
+    elif isinstance(value, list):
+        value[:] = [intern_strings(item) for item in value]
+    elif isinstance(value, tuple):
+        return tuple(intern_strings(item) for item in value)
+    elif isinstance(value, dict):
+        return {intern_strings(k): intern_strings(v) for k, v in value.items()}
+    return value
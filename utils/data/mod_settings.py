@@ -5,7 +5,7 @@ from dataclasses_json import LetterCase, dataclass_json
 
 
 @dataclass_json(letter_case=LetterCase.CAMEL)
-@dataclass
+@dataclass(slots=True)
 class ModSettings:
     provider: str
     repo: str
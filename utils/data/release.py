@@ -1,18 +1,21 @@
+import sys
 from dataclasses import dataclass
 
 from dataclasses_json import dataclass_json
 
 
 @dataclass_json
-@dataclass
+@dataclass(slots=True)
 class Release:
     tag: str
     version: str
-    title: str
-    body: str
     attached_files: list[tuple[str, str]]
     by: str
     published_at: int
     prerelease: bool
     link: str
     is_prebuilt: bool = True
+
+    def __post_init__(self):
+        if self.by is not None:
+            self.by = sys.intern(self.by)
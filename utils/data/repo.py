@@ -1,10 +1,11 @@
+import sys
 from dataclasses import dataclass
 
 from dataclasses_json import dataclass_json
 
 
 @dataclass_json
-@dataclass
+@dataclass(slots=True)
 class Repo:
     name: str
     git_url: str
@@ -13,3 +14,10 @@ class Repo:
     owner: str
     authors: list[str]
     master_branch: str
+
+    def __post_init__(self):
+        # These are copied into every version of the mod, see utils.compact
+        self.html_url = sys.intern(self.html_url)
+        self.issue_url = sys.intern(self.issue_url)
+        self.owner = sys.intern(self.owner)
+        self.authors = [sys.intern(author) for author in self.authors]
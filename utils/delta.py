@@ -0,0 +1,109 @@
+import json
+from typing import Optional
+
+from .store import JsonStore
+from .utils import TMP_DIRS
+
+DEFAULT_HISTORY = 48
+
+
+def get_versions(mod: dict) -> dict[str, dict]:
+    """Get all versions of a mod from the repo file, by version string, newest first.
+
+    :param mod: a mod of the repo file, with its older versions in ext.alt_versions
+
+    """
+    latest = {**mod, "ext": {**mod["ext"], "alt_versions": []}}
+    versions = {latest["version"]: latest}
+    for version in mod["ext"].get("alt_versions") or []:
+        versions.setdefault(version["version"], version)
+    return versions
+
+
+def get_mods(content: dict) -> dict[str, dict]:
+    mods = {}
+    for mod in content.get("mods", []):
+        mods.setdefault(mod["id"], mod)
+    return mods
+
+
+def diff(old: dict, new: dict) -> dict:
+    """Get the changes between two repo files.
+
+    Changed mods list the versions that were added or changed (``upsert``), the versions that
+    were removed (``remove``) and the new order of all versions (``versions``, latest first).
+
+    :param old: the previous repo file content
+    :param new: the new repo file content
+
+    """
+    old_mods = get_mods(old)
+    new_mods = get_mods(new)
+    changed = []
+    for mod_id, mod in new_mods.items():
+        if mod_id not in old_mods or old_mods[mod_id] == mod:
+            continue
+        old_versions = get_versions(old_mods[mod_id])
+        new_versions = get_versions(mod)
+        changed.append(
+            {
+                "id": mod_id,
+                "versions": list(new_versions),
+                "upsert": [
+                    version
+                    for name, version in new_versions.items()
+                    if old_versions.get(name) != version
+                ],
+                "remove": [name for name in old_versions if name not in new_versions],
+            }
+        )
+    return {
+        "from": old["lastUpdated"],
+        "to": new["lastUpdated"],
+        "added": [mod for mod_id, mod in new_mods.items() if mod_id not in old_mods],
+        "removed": [mod_id for mod_id in old_mods if mod_id not in new_mods],
+        "changed": changed,
+    }
+
+
+class DeltaFeed:
+    """Keeps the last repo file and a bounded history of the changes between runs.
+
+    A client that knows the repo file as of ``lastUpdated`` applies every delta with ``from``
+    at or after that time, in order. If its version is older than the oldest delta, it has to
+    fetch the full repo file instead.
+    """
+
+    def __init__(self, *sub, history: int = DEFAULT_HISTORY):
+        self.store = JsonStore(TMP_DIRS.get_path_nc(*sub))
+        self.history = history
+
+    def update(self, content: dict) -> Optional[dict]:
+        """Record a new repo file and get the delta feed up to it.
+
+        :param content: the new repo file content
+        :returns: the delta feed, or None if there is no previous repo file to compare to
+
+        """
+        # Compare what was written to the repo file, not the python objects (tuples vs. lists)
+        content = json.loads(json.dumps(content))
+        previous = self.store.data.get("catalog")
+        deltas = self.store.data.get("deltas", [])
+        if previous is not None and previous.get("rootId") == content["rootId"]:
+            deltas = (deltas + [diff(previous, content)])[-self.history :]
+        else:
+            deltas = []
+        self.store.data["catalog"] = content
+        self.store.data["deltas"] = deltas
+        self.store.save()
+        if not deltas:
+            return None
+        return {
+            "rootId": content["rootId"],
+            "lastUpdated": content["lastUpdated"],
+            "oldest": deltas[0]["from"],
+            "deltas": deltas,
+        }
+
+
+DELTA_FEED = DeltaFeed("delta.json")
@@ -0,0 +1,176 @@
+import asyncio
+import json
+import os
+import pathlib
+import time
+from typing import Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+from loguru import logger
+
+from .http import SESSIONS, SessionPool
+from .report import REPORT
+from .utils import write_atomic
+
+
+class DownloadError(Exception):
+    pass
+
+
+class DownloadManager:
+    """Downloads files into ``.part`` files that are resumed, retried and renamed once complete.
+
+    A file only exists under its final name once it was downloaded completely, so an
+    interrupted download is never mistaken for a finished one. Next to each file, a
+    ``.json`` file records its url and size, and for a ``.part`` file the validator
+    (``ETag`` or ``Last-Modified``) it is resumed with. A file without one, or that
+    doesn't match it, is downloaded again.
+    """
+
+    def __init__(
+        self,
+        sessions: SessionPool,
+        per_host: int = 4,
+        retries: int = 4,
+        backoff: float = 1.0,
+        chunk_size: int = 64 * 1024,
+    ):
+        self.sessions = sessions
+        self.per_host = per_host
+        self.retries = retries
+        self.backoff = backoff
+        self.chunk_size = chunk_size
+        self._hosts: dict[str, asyncio.Semaphore] = {}
+
+    def _host_slots(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        if host not in self._hosts:
+            self._hosts[host] = asyncio.Semaphore(self.per_host)
+        return self._hosts[host]
+
+    @staticmethod
+    def _meta_path(path: pathlib.Path) -> pathlib.Path:
+        return path.with_name(path.name + ".json")
+
+    def _read_meta(self, path: pathlib.Path) -> dict:
+        try:
+            with open(self._meta_path(path), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def has(self, url: str, path) -> bool:
+        """Whether ``url`` was downloaded to ``path`` completely before.
+
+        :param url: the url
+        :param path: where the file is stored
+
+        """
+        path = pathlib.Path(path)
+        meta = self._read_meta(path)
+        return (
+            path.is_file()
+            and meta.get("url") == url
+            and meta.get("size") == path.stat().st_size
+        )
+
+    @staticmethod
+    def _validator(resp: aiohttp.ClientResponse) -> Optional[str]:
+        # If-Range only accepts strong ETags
+        etag = resp.headers.get("ETag")
+        if etag and not etag.startswith("W/"):
+            return etag
+        return resp.headers.get("Last-Modified")
+
+    async def _fetch(self, url: str, part: pathlib.Path, timeout: float):
+        meta = self._read_meta(part)
+        offset = part.stat().st_size if part.exists() else 0
+        if offset and (meta.get("url") != url or not meta.get("validator")):
+            # Without a validator, the remote file may have changed since, so start over
+            offset = 0
+        start = time.perf_counter()
+        status, received = None, 0
+        try:
+            async with self.sessions.session(url).get(
+                url,
+                headers=(
+                    {"Range": f"bytes={offset}-", "If-Range": meta["validator"]}
+                    if offset
+                    else None
+                ),
+                timeout=aiohttp.ClientTimeout(
+                    total=None, sock_connect=timeout, sock_read=timeout
+                ),
+            ) as resp:
+                status = resp.status
+                if resp.status == 416:
+                    part.unlink()
+                    raise DownloadError(f"Can't resume download, restarting: {url}")
+                resp.raise_for_status()
+                if resp.status != 206:
+                    # Not resumed, either not asked to or the validator didn't match anymore
+                    offset = 0
+                    write_atomic(
+                        self._meta_path(part),
+                        json.dumps({"url": url, "validator": self._validator(resp)}),
+                    )
+                expected = (
+                    offset + resp.content_length
+                    if resp.content_length is not None
+                    else None
+                )
+                with open(part, "ab" if offset else "wb") as f:
+                    async for chunk in resp.content.iter_chunked(self.chunk_size):
+                        f.write(chunk)
+                        received += len(chunk)
+        finally:
+            REPORT.request(
+                urlsplit(url).netloc, time.perf_counter() - start, received, status
+            )
+        size = part.stat().st_size
+        if expected is not None and size != expected:
+            raise DownloadError(f"Expected {expected} bytes, got {size}: {url}")
+
+    async def download(self, url: str, path, timeout: float = 60) -> pathlib.Path:
+        """Download ``url`` to ``path``, unless it was downloaded completely before.
+
+        :param url: the url to download
+        :param path: where to store the file
+        :param timeout: timeout in seconds for connecting and for every read
+
+        """
+        path = pathlib.Path(path)
+        if self.has(url, path):
+            return path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        part = path.with_name(path.name + ".part")
+        async with self._host_slots(url):
+            for attempt in range(self.retries + 1):
+                try:
+                    await self._fetch(url, part, timeout)
+                    break
+                except (aiohttp.ClientError, TimeoutError, DownloadError) as e:
+                    if (
+                        isinstance(e, aiohttp.ClientResponseError)
+                        and e.status < 500
+                        and e.status != 429
+                    ):
+                        raise
+                    if attempt == self.retries:
+                        raise
+                    delay = self.backoff * 2**attempt
+                    logger.warning(
+                        f"Download failed ({e.__class__.__name__}: {e}), retrying in {delay:g}s: {url}"
+                    )
+                    await asyncio.sleep(delay)
+        write_atomic(
+            self._meta_path(path),
+            json.dumps({"url": url, "size": part.stat().st_size}),
+        )
+        os.replace(part, path)
+        self._meta_path(part).unlink(missing_ok=True)
+        return path
+
+
+DOWNLOADS = DownloadManager(SESSIONS)
@@ -0,0 +1,190 @@
+import os
+import platform
+import shutil
+import signal
+import subprocess
+import time
+from typing import IO, NamedTuple, Optional
+
+from loguru import logger
+
+from .utils import TMP_DIRS
+
+is_windows = platform.system() == "Windows"
+
+DEFAULT_TIMEOUT = 20 * 60
+DEFAULT_BUDGET = 4 * 1024 * 1024 * 1024
+# Memory one gradle build (without a daemon) typically needs, including the compiler
+BUILD_MEMORY = 2 * 1024 * 1024 * 1024
+
+
+def memory_bytes() -> Optional[int]:
+    """Physical memory of the machine, None if unknown."""
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def default_workers() -> int:
+    """Builds that can run at once on this machine: one per two cpus, as far as memory allows."""
+    workers = (os.cpu_count() or 2) // 2
+    memory = memory_bytes()
+    if memory:
+        workers = min(workers, memory // BUILD_MEMORY)
+    return max(workers, 1)
+
+
+class BuildResult(NamedTuple):
+    # None if the build timed out
+    returncode: Optional[int]
+    log_path: str
+
+
+class GradleRunner:
+    """Runs gradle builds with a timeout, a log file per build and a shared gradle user home.
+
+    The user home, including the gradle build cache, lives in the cache directory, so
+    dependencies are resolved once instead of per build. Repositories whose dependencies
+    are likely there already are built ``--offline`` first, and online if that fails.
+    A build that runs out of time is killed with all its child processes.
+
+    The user home isn't part of the cache manager's budget, it is kept within its own by
+    ``collect``.
+    """
+
+    def __init__(self, *sub, logs: str = "build-logs", timeout: float = DEFAULT_TIMEOUT):
+        self.user_home = TMP_DIRS.get_path_nc(*sub)
+        self.logs = logs
+        self.timeout = timeout
+        self.builds = 0
+        self.offline = 0
+        self.failures = 0
+        self.timeouts = 0
+
+    def clear_logs(self):
+        """Remove the build logs of the previous run."""
+        shutil.rmtree(self.logs, ignore_errors=True)
+
+    def command(self, offline: bool) -> list[str]:
+        """
+
+        :param offline: whether to pass ``--offline``
+
+        """
+        command = ["cmd", "/c", "gradle"] if is_windows else ["gradle"]
+        command += ["build", "--no-daemon", "--build-cache"]
+        if offline:
+            command.append("--offline")
+        return command
+
+    def _kill(self, proc: subprocess.Popen):
+        if is_windows:
+            subprocess.run(
+                ["taskkill", "/F", "/T", "/PID", str(proc.pid)], capture_output=True
+            )
+        else:
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        proc.wait()
+
+    def _run(self, cwd, log: IO[str], offline: bool, timeout: float) -> Optional[int]:
+        command = self.command(offline)
+        log.write(f"$ {' '.join(command)}\n")
+        log.flush()
+        proc = subprocess.Popen(
+            command,
+            cwd=cwd,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+            env={**os.environ, "GRADLE_USER_HOME": self.user_home},
+            start_new_session=not is_windows,
+        )
+        try:
+            return proc.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            self._kill(proc)
+            log.write(f"\nKilled, the build took longer than {self.timeout:.0f}s.\n")
+            return None
+        except BaseException:
+            self._kill(proc)
+            raise
+
+    def build(self, cwd, name: str, offline: bool = False) -> BuildResult:
+        """Build a checked out repository.
+
+        :param cwd: the repository
+        :param name: name of the log file, without extension
+        :param offline: whether the dependencies were probably resolved by an earlier build
+
+        """
+        os.makedirs(self.logs, exist_ok=True)
+        log_path = os.path.join(self.logs, name + ".log")
+        deadline = time.monotonic() + self.timeout
+        offline = offline and os.path.isdir(self.user_home)
+        self.builds += 1
+        with open(log_path, "w", encoding="utf-8") as log:
+            returncode = self._run(cwd, log, offline, self.timeout)
+            if returncode == 0 and offline:
+                self.offline += 1
+            elif returncode is not None and returncode != 0 and offline:
+                log.write("\nOffline build failed, retrying online.\n")
+                returncode = self._run(
+                    cwd, log, False, max(deadline - time.monotonic(), 0)
+                )
+        if returncode is None:
+            self.timeouts += 1
+        elif returncode != 0:
+            self.failures += 1
+        return BuildResult(returncode, log_path)
+
+    def _entries(self) -> list[tuple[str, int, float]]:
+        entries = []
+        for sub in ("caches", os.path.join("wrapper", "dists")):
+            parent = os.path.join(self.user_home, sub)
+            if not os.path.isdir(parent):
+                continue
+            for entry in os.scandir(parent):
+                size, used = 0, entry.stat(follow_symlinks=False).st_mtime
+                for root, _, files in os.walk(entry.path):
+                    for file in files:
+                        try:
+                            stat = os.lstat(os.path.join(root, file))
+                        except OSError:
+                            continue
+                        size += stat.st_size
+                        used = max(used, stat.st_mtime)
+                entries.append((entry.path, size, used))
+        return entries
+
+    def collect(self, budget: int = DEFAULT_BUDGET) -> int:
+        """Remove the least recently written entries of the user home's ``caches`` (like the
+        dependency, build and transform caches, or those of an older gradle version) and
+        downloaded distributions, until the user home fits into ``budget`` bytes.
+
+        Gradle fills them in again when a build needs them.
+
+        :param budget: the maximum size of the user home
+        :returns: the size of the user home afterwards
+
+        """
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        size = sum(entry[1] for entry in entries)
+        for path, entry_size, _ in entries:
+            if size <= budget:
+                break
+            logger.debug(f"Removing {path} from the gradle user home.")
+            if os.path.isdir(path) and not os.path.islink(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                os.unlink(path)
+            size -= entry_size
+        return size
+
+    def stats(self) -> str:
+        return f"{self.builds} builds ({self.offline} offline), {self.failures} failed, {self.timeouts} timed out"
+
+
+GRADLE = GradleRunner(".gradle")
@@ -0,0 +1,282 @@
+import asyncio
+import hashlib
+import json
+import pathlib
+import time
+from typing import Any, Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+from loguru import logger
+from yarl import URL
+
+from .ratelimit import RateLimiter, RateLimitExceeded
+from .report import REPORT
+from .store import JsonStore
+from .utils import TMP_DIRS, write_atomic
+
+DEFAULT_HTTP_CACHE_BYTES = 64 * 1024 * 1024
+
+
+class HttpCache:
+    """Keeps GET responses together with their validators (ETag / Last-Modified) on disk.
+
+    Cached responses are revalidated with conditional requests and served from disk on ``304 Not Modified``.
+    """
+
+    def __init__(self, *sub, max_bytes: int = DEFAULT_HTTP_CACHE_BYTES):
+        self.dir = pathlib.Path(TMP_DIRS.get_path_nc(*sub))
+        self.max_bytes = max_bytes
+        self.index = JsonStore(self.dir / "index.json")
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(url: str, headers: Optional[dict[str, str]] = None) -> str:
+        accept = (headers or {}).get("Accept", "")
+        return hashlib.sha256(f"{url}\n{accept}".encode("utf-8")).hexdigest()
+
+    def validators(self, key: str) -> dict[str, str]:
+        """Get the headers that make a request for ``key`` conditional.
+
+        :param key: the cache key of the request
+
+        """
+        entry = self.index.data.get(key)
+        if not entry or not (self.dir / key).exists():
+            return {}
+        validators = {}
+        if entry.get("etag"):
+            validators["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            validators["If-Modified-Since"] = entry["last_modified"]
+        return validators
+
+    def load(self, key: str) -> bytes:
+        self.hits += 1
+        self.index.data[key]["accessed"] = time.time()
+        return (self.dir / key).read_bytes()
+
+    def store(self, key: str, url: str, headers, body: bytes):
+        """Store a response, if it has validators.
+
+        :param key: the cache key of the request
+        :param url: the requested url
+        :param headers: the response headers
+        :param body: the response body
+
+        """
+        self.misses += 1
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        if not etag and not last_modified:
+            self.index.data.pop(key, None)
+            return
+        write_atomic(self.dir / key, body)
+        self.index.data[key] = {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "size": len(body),
+            "accessed": time.time(),
+        }
+
+    @property
+    def size(self) -> int:
+        return sum(entry["size"] for entry in self.index.data.values())
+
+    def save(self):
+        """Evict the least recently used responses beyond ``max_bytes`` and write the index."""
+        size = self.size
+        for key, entry in sorted(
+            self.index.data.items(), key=lambda item: item[1]["accessed"]
+        ):
+            if size <= self.max_bytes:
+                break
+            (self.dir / key).unlink(missing_ok=True)
+            del self.index.data[key]
+            size -= entry["size"]
+            self.evictions += 1
+        self.index.save()
+
+    def stats(self) -> str:
+        return f"{self.hits} hits, {self.misses} misses, {self.evictions} evicted, {self.size} bytes stored"
+
+
+class SessionPool:
+    """Keeps one aiohttp session per host, so connections are reused across requests."""
+
+    def __init__(
+        self,
+        limit_per_host: int = 6,
+        dns_cache_ttl: int = 300,
+        keepalive_timeout: int = 30,
+        cache: Optional[HttpCache] = None,
+    ):
+        self.limit_per_host = limit_per_host
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.cache = cache
+        self._sessions: dict[str, aiohttp.ClientSession] = {}
+        self._limiters: dict[str, RateLimiter] = {}
+
+    def session(self, url: str) -> aiohttp.ClientSession:
+        """Get the session for the host of ``url``, creating it if needed.
+
+        :param url: any url on the host
+
+        """
+        parts = urlsplit(url)
+        host = f"{parts.scheme}://{parts.netloc}"
+        session = self._sessions.get(host)
+        if session is None or session.closed:
+            session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit_per_host=self.limit_per_host,
+                    ttl_dns_cache=self.dns_cache_ttl,
+                    keepalive_timeout=self.keepalive_timeout,
+                ),
+            )
+            self._sessions[host] = session
+        return session
+
+    def limit(self, prefix: str, limiter: RateLimiter):
+        """Route requests to urls starting with ``prefix`` through ``limiter``.
+
+        :param prefix: the url prefix, like an API root
+        :param limiter: tracks the rate limit of these urls
+
+        """
+        self._limiters[prefix] = limiter
+
+    def limiter(self, url: str) -> Optional[RateLimiter]:
+        """Get the limiter of the longest prefix matching ``url``.
+
+        :param url: the requested url
+
+        """
+        prefixes = [prefix for prefix in self._limiters if url.startswith(prefix)]
+        return self._limiters[max(prefixes, key=len)] if prefixes else None
+
+    async def _send(
+        self,
+        method: str,
+        url: str,
+        headers: Optional[dict[str, str]] = None,
+        timeout: float = 60,
+        **kwargs,
+    ) -> tuple[int, Any, bytes]:
+        limiter = self.limiter(url)
+        attempt = 0
+        while True:
+            if limiter:
+                await limiter.wait()
+            start = time.perf_counter()
+            status, size = None, 0
+            try:
+                async with self.session(url).request(
+                    method,
+                    url,
+                    headers=headers,
+                    timeout=aiohttp.ClientTimeout(total=timeout),
+                    **kwargs,
+                ) as resp:
+                    status = resp.status
+                    body = await resp.read()
+                    size = len(body)
+                    delay = None
+                    if limiter:
+                        limiter.update(resp.headers)
+                        delay = limiter.retry_delay(resp.status, resp.headers)
+                    if delay is None or attempt >= limiter.retries:
+                        resp.raise_for_status()
+                        return resp.status, resp.headers, body
+            finally:
+                REPORT.request(
+                    urlsplit(url).netloc, time.perf_counter() - start, size, status
+                )
+            if delay > limiter.max_wait:
+                raise RateLimitExceeded(
+                    f"{limiter.name} asked to retry in {delay:.0f}s: {url}"
+                )
+            logger.warning(
+                f"{limiter.name} rate limited a request, retrying in {delay:.0f}s: {url}"
+            )
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def get(
+        self,
+        url: str,
+        headers: Optional[dict[str, str]] = None,
+        params: Optional[dict[str, Any]] = None,
+        timeout: float = 60,
+    ) -> bytes:
+        """GET ``url``, revalidating a cached response if there is one.
+
+        :param url: the url to fetch
+        :param headers: additional request headers
+        :param params: query parameters
+        :param timeout: total timeout in seconds
+
+        """
+        if params:
+            url = str(URL(url).update_query(params))
+        key = self.cache.key(url, headers) if self.cache else None
+        validators = self.cache.validators(key) if self.cache else {}
+        status, resp_headers, body = await self._send(
+            "GET", url, headers={**(headers or {}), **validators}, timeout=timeout
+        )
+        if status == 304 and validators:
+            return self.cache.load(key)
+        if self.cache:
+            self.cache.store(key, url, resp_headers, body)
+        return body
+
+    async def get_json(
+        self,
+        url: str,
+        headers: Optional[dict[str, str]] = None,
+        params: Optional[dict[str, Any]] = None,
+        timeout: float = 60,
+    ) -> Any:
+        """GET ``url`` and decode the response as json.
+
+        :param url: the url to fetch
+        :param headers: additional request headers
+        :param params: query parameters
+        :param timeout: total timeout in seconds
+
+        """
+        body = await self.get(url, headers=headers, params=params, timeout=timeout)
+        return json.loads(body) if body.strip() else None
+
+    async def post_json(
+        self,
+        url: str,
+        data: Any,
+        headers: Optional[dict[str, str]] = None,
+        timeout: float = 60,
+    ) -> Any:
+        """POST ``data`` as json to ``url`` and decode the response as json.
+
+        :param url: the url to post to
+        :param data: the json payload
+        :param headers: additional request headers
+        :param timeout: total timeout in seconds
+
+        """
+        _, _, body = await self._send(
+            "POST", url, headers=headers, timeout=timeout, json=data
+        )
+        return json.loads(body) if body.strip() else None
+
+    async def close(self):
+        await asyncio.gather(*(session.close() for session in self._sessions.values()))
+        self._sessions.clear()
+        if self.cache:
+            self.cache.save()
+
+
+SESSIONS = SessionPool(cache=HttpCache("http"))
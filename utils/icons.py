@@ -0,0 +1,78 @@
+import hashlib
+import io
+import pathlib
+from typing import Iterable
+
+from loguru import logger
+
+from .utils import prune_unreferenced, write_atomic
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional, icons are stored as they are if it isn't installed
+    Image = None
+
+
+class IconStore:
+    """Stores mod icons by content, as ``<root>/<sha256 prefix>.<extension>``.
+
+    An icon shared by several versions (or mods) is stored, and downloaded, once. If Pillow
+    is installed, icons larger than ``max_size`` pixels are downsized and recompressed.
+    """
+
+    def __init__(self, root: str = "icons", max_size: int = 128):
+        self.root = pathlib.Path(root)
+        self.max_size = max_size
+
+    def normalize(self, data: bytes, name: str) -> tuple[bytes, str]:
+        """Downsize an icon if Pillow is installed and it is too large.
+
+        :param data: the icon
+        :param name: the file name of the icon
+        :returns: the icon and its extension
+
+        """
+        suffix = pathlib.PurePosixPath(name).suffix.lower() or ".png"
+        if Image is None:
+            return data, suffix
+        try:
+            with Image.open(io.BytesIO(data)) as image:
+                if max(image.size) <= self.max_size:
+                    return data, suffix
+                image.thumbnail((self.max_size, self.max_size))
+                if image.mode not in ("1", "L", "LA", "P", "RGB", "RGBA"):
+                    image = image.convert("RGBA")
+                out = io.BytesIO()
+                image.save(out, "PNG", optimize=True)
+        except Exception as e:
+            logger.debug(f"Keeping icon {name} as it is, it couldn't be downsized: {e}")
+            return data, suffix
+        return out.getvalue(), ".png"
+
+    def add(self, data: bytes, name: str) -> str:
+        """Store an icon, unless an icon with the same content is stored already.
+
+        :param data: the icon
+        :param name: the file name of the icon
+        :returns: the path of the stored icon, relative to the working directory, with forward slashes
+
+        """
+        data, suffix = self.normalize(data, name)
+        path = self.root / (hashlib.sha256(data).hexdigest()[:16] + suffix)
+        if not path.exists():
+            write_atomic(path, data)
+        return path.as_posix()
+
+    def prune(self, referenced: Iterable[str]) -> list[pathlib.Path]:
+        """Delete every stored icon that isn't referenced anymore.
+
+        :param referenced: paths of the icons that are still in use, as returned by ``add``
+        :returns: the deleted icons
+
+        """
+        kept, pruned = prune_unreferenced(self.root, referenced)
+        logger.info(f"Icons: {kept} referenced, {len(pruned)} pruned.")
+        return pruned
+
+
+ICONS = IconStore()
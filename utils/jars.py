@@ -0,0 +1,142 @@
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Iterator, NamedTuple, Optional
+
+from loguru import logger
+
+from . import data as datacls
+from . import parser as parsers
+from .icons import ICONS
+from .report import REPORT
+from .utils import JarReader
+
+# The config file of each loader, its parser and where it names the icon
+LOADERS = (
+    ("fabric.mod.json", parsers.parse_fabric_mod_json, lambda data: data.get("icon")),
+    (
+        "quilt.mod.json",
+        parsers.parse_quilt_mod_json,
+        lambda data: data.get("quilt_loader", {}).get("metadata", {}).get("icon"),
+    ),
+)
+
+_logs: list[tuple[str, str]] = []
+
+
+class ParseResult(NamedTuple):
+    """What a worker process hands back for a jar: the mod as a dict (None if it couldn't be
+    parsed), the log messages as ``(level, message)`` and the report records of the stages."""
+
+    mod: Optional[dict]
+    logs: list[tuple[str, str]]
+    records: list[dict]
+
+
+def _init_worker():
+    logger.remove()
+    logger.add(
+        lambda message: _logs.append(
+            (message.record["level"].name, message.record["message"])
+        ),
+        level="DEBUG",
+    )
+
+
+@contextmanager
+def process_pool(workers: int) -> Iterator[Optional[ProcessPoolExecutor]]:
+    """Create the process pool jars are hashed and parsed in, shut down after the block.
+
+    Workers are spawned rather than forked, as the main process runs threads. They send
+    their log messages back with the result instead of logging themselves. With a single
+    worker, no pool is created, as starting it would cost more than it saves.
+
+    :param workers: number of processes
+
+    """
+    if workers < 2:
+        yield None
+        return
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+    ) as pool:
+        yield pool
+
+
+def _store_icon(
+    base_address: str,
+    jar: JarReader,
+    icon: Optional[str],
+    settings: datacls.ModSettings,
+    release: datacls.Release,
+) -> Optional[str]:
+    if not icon or not jar.has(icon):
+        return None
+    with REPORT.stage("icon", settings.repo, release.version) as record:
+        path = ICONS.add(jar.read(icon), icon)
+        record["bytes"] = os.path.getsize(path)
+    return base_address + path
+
+
+def _parse_jar(
+    base_address: str,
+    jar_path: str,
+    settings: datacls.ModSettings,
+    repo: datacls.Repo,
+    release: datacls.Release,
+):
+    with REPORT.stage("unzip", settings.repo, release.version):
+        jar = JarReader(jar_path)
+    with jar:
+        loader = next((loader for loader in LOADERS if jar.has(loader[0])), None)
+        if loader is None:
+            with REPORT.stage("parse", settings.repo, release.version) as record:
+                record["failed"] = True
+            logger.warning(
+                f"[{settings.repo}] [{release.version}] Skipping because it doesn't have a parsable config file."
+            )
+            return
+        config, parse, get_icon = loader
+        with REPORT.stage("unzip", settings.repo, release.version) as record:
+            record["bytes"] = jar.zip.getinfo(config).file_size
+            with jar.open(config, "r", encoding="utf-8") as f:
+                json_data = json.load(f)
+        icon = _store_icon(base_address, jar, get_icon(json_data), settings, release)
+        with REPORT.stage("parse", settings.repo, release.version) as record:
+            mod = parse(settings, repo, json_data, icon, release)
+            if not mod:
+                record["failed"] = True
+                logger.warning(
+                    f"[{settings.repo}] [{release.version}] Skipping because it failed to parse the config file."
+                )
+                return
+    return mod
+
+
+def parse_jar(
+    base_address: str,
+    jar_path: str,
+    settings: datacls.ModSettings,
+    repo: datacls.Repo,
+    release: datacls.Release,
+) -> ParseResult:
+    """Unzip a jar, parse its mod config and store its icon.
+
+    Meant to run in a worker process of ``process_pool``, so the result only holds plain
+    values. In the main process, the messages are logged right away instead.
+
+    :param base_address: the address the repo is served at
+    :param jar_path: the jar to parse
+    :param settings: settings of the mod
+    :param repo: the repo the release belongs to
+    :param release: the release the jar belongs to
+
+    """
+    _logs.clear()
+    with REPORT.capture() as records:
+        mod = _parse_jar(base_address, jar_path, settings, repo, release)
+    return ParseResult(mod.to_dict() if mod else None, list(_logs), records)
@@ -0,0 +1,77 @@
+import hashlib
+import json
+import time
+from typing import Any, Optional
+
+from .parser import PARSER_VERSION
+from .store import JsonStore
+from .utils import TMP_DIRS
+
+DEFAULT_MAX_AGE = 30 * 24 * 60 * 60
+
+
+class ParseMemo:
+    """Remembers the parse result of a jar by its sha256.
+
+    An entry is only used if it was produced by the same ``PARSER_VERSION`` and the same
+    context (mod settings, repo and release), otherwise the jar is parsed again.
+    """
+
+    def __init__(self, *sub, max_age: float = DEFAULT_MAX_AGE):
+        self.store = JsonStore(TMP_DIRS.get_path_nc(*sub))
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def context(*parts: Any) -> str:
+        """Fingerprint everything besides the jar that the parse result depends on.
+
+        :param *parts: json serializable values
+
+        """
+        return hashlib.sha256(
+            json.dumps(parts, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()
+
+    def get(self, digest: str, context: str) -> tuple[bool, Optional[dict]]:
+        """Look up the parse result of a jar.
+
+        :param digest: sha256 of the jar
+        :param context: see ``ParseMemo.context``
+        :returns: whether there was a result, and the result (None if the jar couldn't be parsed)
+
+        """
+        entry = self.store.data.get(digest)
+        if (
+            not entry
+            or entry["parser"] != PARSER_VERSION
+            or entry["context"] != context
+        ):
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        entry["accessed"] = time.time()
+        return True, entry["mod"]
+
+    def put(self, digest: str, context: str, mod: Optional[dict]):
+        self.store.data[digest] = {
+            "parser": PARSER_VERSION,
+            "context": context,
+            "mod": mod,
+            "accessed": time.time(),
+        }
+
+    def save(self):
+        """Drop entries that weren't used for ``max_age`` seconds and write the memo."""
+        oldest = time.time() - self.max_age
+        for digest, entry in list(self.store.data.items()):
+            if entry["accessed"] < oldest:
+                del self.store.data[digest]
+        self.store.save()
+
+    def stats(self) -> str:
+        return f"{self.hits} hits, {self.misses} misses"
+
+
+PARSE_MEMO = ParseMemo("parsed.json")
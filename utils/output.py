@@ -0,0 +1,94 @@
+import asyncio
+import gzip
+import json
+from typing import Callable
+
+import hjson
+
+from .report import REPORT
+from .utils import write_atomic
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, .br files are only written if it is installed
+    brotli = None
+
+
+def _compressors() -> dict[str, Callable[[bytes], bytes]]:
+    compressors = {"gz": lambda data: gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        compressors["br"] = lambda data: brotli.compress(data, quality=11)
+    return compressors
+
+
+def _write_encoded(path: str, serialize: Callable[[], str], compress: bool = True):
+    with REPORT.stage("serialize") as record:
+        data = serialize().encode("utf-8")
+        files = {path: data}
+        if compress:
+            for suffix, compressor in _compressors().items():
+                files[f"{path}.{suffix}"] = compressor(data)
+        record["bytes"] = len(data)
+    for file, payload in files.items():
+        with REPORT.stage("write") as record:
+            write_atomic(file, payload)
+            record["bytes"] = len(payload)
+
+
+def _write_json(name: str, content: dict):
+    _write_encoded(f"{name}.json", lambda: json.dumps(content, indent=4))
+
+
+def _write_min_json(name: str, content: dict):
+    _write_encoded(
+        f"{name}.min.json", lambda: json.dumps(content, separators=(",", ":"))
+    )
+
+
+def _write_hjson(name: str, content: dict):
+    _write_encoded(f"{name}.hjson", lambda: hjson.dumps(content, indent=4), False)
+
+
+# The output formats by extension, and whether they are also written precompressed
+FORMATS = {
+    "json": (_write_json, True),
+    "min.json": (_write_min_json, True),
+    "hjson": (_write_hjson, False),
+}
+
+
+def output_paths(name: str, formats: tuple[str, ...] = tuple(FORMATS)) -> list[str]:
+    """Get every file ``write_outputs`` may write for ``name``, precompressed ones included.
+
+    :param name: path of the output files, without extension
+    :param formats: the formats, see ``FORMATS``
+
+    """
+    paths = []
+    for extension in formats:
+        path = f"{name}.{extension}"
+        paths.append(path)
+        if FORMATS[extension][1]:
+            paths.extend(f"{path}.{suffix}" for suffix in ("gz", "br"))
+    return paths
+
+
+async def write_outputs(
+    name: str, content: dict, formats: tuple[str, ...] = tuple(FORMATS)
+):
+    """Write ``content`` as ``<name>.json``, ``<name>.hjson`` and ``<name>.min.json``.
+
+    The json files are also written precompressed (``.gz``, and ``.br`` if brotli is installed).
+    All files are written concurrently and replaced atomically, so readers never see a partial file.
+
+    :param name: path of the output files, without extension
+    :param content: the document to write
+    :param formats: the formats to write, see ``FORMATS``
+
+    """
+    await asyncio.gather(
+        *(
+            asyncio.to_thread(FORMATS[extension][0], name, content)
+            for extension in formats
+        )
+    )
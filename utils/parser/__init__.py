@@ -1,2 +1,5 @@
 from .fabric_mod_json import parse_fabric_mod_json
 from .quilt_mod_json import parse_quilt_mod_json
+
+# Bump this when a change to the parsers changes their output, so memoized results are discarded.
+PARSER_VERSION = 2
@@ -1,5 +1,4 @@
-import os
-import pathlib
+from typing import Optional
 
 from crm1.helpers.versions import Version, range_from_maven_string
 from crm1.spec.v2 import CommonModExt, RDependency, RMod
@@ -9,19 +8,13 @@ from ..data import ModSettings, Release, Repo
 
 
 def parse_fabric_mod_json(
-    base_address: str,
     settings: ModSettings,
     repo: Repo,
     data: dict,
-    jardir: pathlib.Path,
+    icon: Optional[str],
     release: Release,
 ) -> RMod:
     dependencies = {name: version for name, version in data.get("depends", {}).items()}
-    icon_path = (
-        (base_address + (jardir.relative_to(os.getcwd()) / data.get("icon")).as_posix())
-        if data.get("icon")
-        else None
-    )
 
     if (version := data.get("version")) is not None:
         try:
@@ -65,7 +58,7 @@ def parse_fabric_mod_json(
         ],
         ext=CommonModExt(
             modid=data.get("id"),
-            icon=icon_path,
+            icon=icon,
             loader="fabric",
             loader_version=(
                 range_from_maven_string(dependencies.get("fabricloader")).to_string()
@@ -1,5 +1,4 @@
-import os
-import pathlib
+from typing import Optional
 
 from crm1.helpers.versions import Version, range_from_maven_string
 from crm1.spec.v2 import CommonModExt, RDependency, RMod
@@ -9,11 +8,10 @@ from ..data import ModSettings, Release, Repo
 
 
 def parse_quilt_mod_json(
-    base_address: str,
     settings: ModSettings,
     repo: Repo,
     data: dict,
-    jardir: pathlib.Path,
+    icon: Optional[str],
     release: Release,
 ) -> RMod:
     loader_data = data.get("quilt_loader", {})
@@ -29,14 +27,6 @@ def parse_quilt_mod_json(
         if loader_data.get("group") is not None
         else "io.github." + repo.owner + "." + loader_data.get("id")
     )
-    icon_path = (
-        (
-            base_address
-            + (jardir.relative_to(os.getcwd()) / metadata.get("icon")).as_posix()
-        )
-        if metadata.get("icon")
-        else None
-    )
 
     try:
         deps = [
@@ -86,7 +76,7 @@ def parse_quilt_mod_json(
         deps=deps,
         ext=CommonModExt(
             modid=loader_data.get("id"),
-            icon=icon_path,
+            icon=icon,
             loader="quilt",
             loader_version=(
                 range_from_maven_string(
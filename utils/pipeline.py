@@ -0,0 +1,103 @@
+import asyncio
+import os
+from concurrent.futures import Executor
+from typing import Any, Awaitable, Callable, Iterable, Optional
+
+from .gradle import default_workers
+
+DEFAULT_WORKERS: dict[str, int] = {
+    "metadata": 8,
+    "download": 4,
+    "build": default_workers(),
+    "parse": os.cpu_count() or 2,
+    "finalize": 1,
+}
+
+
+class Stage:
+    """A bounded pool of workers for one step of the pipeline."""
+
+    def __init__(self, name: str, workers: int):
+        if workers < 1:
+            raise ValueError(f"Stage {name} needs at least one worker, got {workers}")
+        self.name = name
+        self.workers = workers
+        self.executor: Optional[Executor] = None
+        self._slots = asyncio.Semaphore(workers)
+
+    async def run(self, func: Callable, *args) -> Any:
+        """Run ``func`` once a worker of this stage is free.
+
+        Coroutine functions are awaited directly, blocking functions are run in the stage's
+        ``executor`` if it has one, in a thread otherwise.
+
+        :param func: the function to run
+        :param *args: passed to ``func``
+
+        """
+        async with self._slots:
+            if asyncio.iscoroutinefunction(func):
+                return await func(*args)
+            if self.executor is not None:
+                return await asyncio.get_running_loop().run_in_executor(
+                    self.executor, func, *args
+                )
+            return await asyncio.to_thread(func, *args)
+
+
+class Pipeline:
+    """Stages a mod passes through, each with its own bounded worker pool.
+
+    At most ``backlog`` mods are in flight at once, so a slow stage holds back the
+    stages in front of it instead of letting work pile up.
+    """
+
+    def __init__(self, workers: Optional[dict[str, int]] = None, backlog: Optional[int] = None):
+        unknown = set(workers or {}) - set(DEFAULT_WORKERS)
+        if unknown:
+            raise ValueError(f"Unknown pipeline stage(s): {', '.join(sorted(unknown))}")
+        self.workers = {**DEFAULT_WORKERS, **(workers or {})}
+        self.metadata = Stage("metadata", self.workers["metadata"])
+        self.download = Stage("download", self.workers["download"])
+        self.build = Stage("build", self.workers["build"])
+        self.parse = Stage("parse", self.workers["parse"])
+        self.finalize = Stage("finalize", self.workers["finalize"])
+        self.backlog = backlog or self.workers["metadata"] * 2
+        self._admission = asyncio.Semaphore(self.backlog)
+        self._locks: dict[tuple, asyncio.Lock] = {}
+
+    def lock(self, *key) -> asyncio.Lock:
+        """Get the lock guarding a shared resource, like a cache directory.
+
+        :param *key: identifies the resource
+
+        """
+        if key not in self._locks:
+            self._locks[key] = asyncio.Lock()
+        return self._locks[key]
+
+    async def _admit(self, func: Callable[[Any], Awaitable], item) -> Any:
+        async with self._admission:
+            return await func(item)
+
+    async def map(self, func: Callable[[Any], Awaitable], items: Iterable) -> list:
+        """Feed every item through ``func`` concurrently.
+
+        The results are returned in the order of ``items``, regardless of completion order.
+
+        :param func: coroutine function processing one item
+        :param items: the items to process
+
+        """
+        return await gather(*(self._admit(func, item) for item in items))
+
+
+async def gather(*aws: Awaitable) -> list:
+    """Like ``asyncio.gather``, but cancels the remaining awaitables if one fails.
+
+    :param *aws: the awaitables to run
+
+    """
+    async with asyncio.TaskGroup() as group:
+        tasks = [group.create_task(aw) for aw in aws]
+    return [task.result() for task in tasks]
@@ -0,0 +1,100 @@
+import time
+from typing import Optional
+
+from . import data as datacls
+from .store import JsonStore
+from .utils import TMP_DIRS
+
+DEFAULT_MAX_AGE = 24 * 60 * 60
+
+
+class PreviousOutputs:
+    """Remembers the last mod generated for every configured repository, with its fingerprint.
+
+    Mods that can't be loaded in a run (like when the rate limit is exhausted) fall back to it,
+    instead of dropping out of the repo. Mods whose fingerprint didn't change reuse it without
+    being loaded at all, until it is ``max_age`` seconds old.
+    """
+
+    def __init__(self, *sub, max_age: float = DEFAULT_MAX_AGE):
+        self.store = JsonStore(TMP_DIRS.get_path_nc(*sub))
+        self.max_age = max_age
+        self.reused = 0
+        self.unchanged = 0
+
+    @staticmethod
+    def key(settings: datacls.ModSettings) -> str:
+        # A repository can hold several mods, in different folders or with different ids
+        return ":".join(
+            [
+                settings.provider,
+                settings.instance or "",
+                settings.repo.lower(),
+                settings.folder or "",
+                settings.id or "",
+            ]
+        )
+
+    def get(self, settings: datacls.ModSettings) -> Optional[dict]:
+        return (self.store.data.get(self.key(settings)) or {}).get("mod")
+
+    def get_unchanged(
+        self, settings: datacls.ModSettings, fingerprint: str
+    ) -> Optional[dict]:
+        """Get the previous output, if the mod didn't change since it was loaded.
+
+        :param settings: datacls.ModSettings: the mod
+        :param fingerprint: the current fingerprint of the mod
+
+        """
+        entry = self.store.data.get(self.key(settings)) or {}
+        if (
+            entry.get("fingerprint") != fingerprint
+            or entry.get("loaded", 0) < time.time() - self.max_age
+        ):
+            return None
+        self.unchanged += 1
+        return entry["mod"]
+
+    def put(
+        self, settings: datacls.ModSettings, mod: dict, fingerprint: Optional[str] = None
+    ):
+        self.store.data[self.key(settings)] = {
+            "mod": mod,
+            "fingerprint": fingerprint,
+            "loaded": time.time(),
+        }
+
+    def changed_at(self, settings: datacls.ModSettings) -> Optional[float]:
+        """Get when the newest version of the previous output was published.
+
+        :param settings: datacls.ModSettings: the mod
+
+        """
+        mod = self.get(settings)
+        if mod is None:
+            return None
+        return max(
+            (v["ext"].get("published_at") or 0)
+            for v in [mod, *(mod["ext"].get("alt_versions") or [])]
+        )
+
+    def prune(self, mod_settings: list[datacls.ModSettings]):
+        """Forget the output of repositories that are no longer configured.
+
+        :param mod_settings: the configured mods
+
+        """
+        keep = {self.key(settings) for settings in mod_settings}
+        for key in list(self.store.data):
+            if key not in keep:
+                del self.store.data[key]
+
+    def save(self):
+        self.store.save()
+
+    def stats(self) -> str:
+        return f"{self.unchanged} unchanged, {self.reused} reused"
+
+
+PREVIOUS = PreviousOutputs("previous.json")
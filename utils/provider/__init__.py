@@ -1,3 +1,5 @@
+from typing import Optional
+
 from .. import data as datacls
 from . import forgejo, github
 
@@ -5,6 +7,26 @@ from . import forgejo, github
 class _ProviderTyping:
     """ """
 
+    async def prefetch(self, settings: list[datacls.ModSettings]) -> None:
+        # Optional, only implemented by providers that can load many repositories at once (see github.py)
+        raise NotImplementedError
+
+    async def budget(self) -> Optional[int]:
+        # Optional, only implemented by rate limited providers (see github.py). Requests left for this run, None if unknown.
+        raise NotImplementedError
+
+    def cost(self, settings: datacls.ModSettings) -> int:
+        # Optional, implemented together with budget. Estimated requests needed to load a mod.
+        raise NotImplementedError
+
+    def changed_at(self, settings: datacls.ModSettings) -> Optional[float]:
+        # Optional, implemented together with budget. When the repository of a mod last changed, if known.
+        raise NotImplementedError
+
+    async def fingerprint(self, settings: datacls.ModSettings) -> dict:
+        # Optional. A cheap summary of the repository that changes whenever the output of the mod may change.
+        raise NotImplementedError
+
     async def get_repo(self, settings: datacls.ModSettings) -> datacls.Repo:
         # This is only a type hint. look in the forgejo.py and github.py for the actual implementation
         raise NotImplementedError
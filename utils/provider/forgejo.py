@@ -1,19 +1,52 @@
+import asyncio
 from datetime import datetime
 
-import aiohttp
-import requests
-
 from .. import datacls
+from ..http import SESSIONS
+
+
+async def fingerprint(settings: datacls.ModSettings) -> dict:
+    """Get what changes when the output of a mod may change, with as few requests as possible.
+
+    The asset names of the latest release are included, as jars are often uploaded after
+    the release was created.
+
+    :param settings: datacls.ModSettings: the mod
+
+    """
+    instance = (settings.instance or "https://codeberg.org").removesuffix("/")
+    repo_data, releases_data = await asyncio.gather(
+        SESSIONS.get_json(f"{instance}/api/v1/repos/{settings.repo}", timeout=60),
+        SESSIONS.get_json(
+            f"{instance}/api/v1/repos/{settings.repo}/releases",
+            params={"limit": 1},
+            timeout=60,
+        ),
+    )
+    head = None
+    if settings.dev_builds:
+        commits_data = await SESSIONS.get_json(
+            f"{instance}/api/v1/repos/{settings.repo}/commits",
+            params={"limit": 1, "stat": "false"},
+            timeout=60,
+        )
+        head = commits_data[0]["sha"]
+    return {
+        "updated_at": repo_data["updated_at"],
+        "release": releases_data[0]["id"] if releases_data else None,
+        "assets": (
+            [asset["name"] for asset in releases_data[0]["assets"]] if releases_data else []
+        ),
+        "head": head,
+    }
 
 
-def get_repo(settings: datacls.ModSettings) -> datacls.Repo:
+async def get_repo(settings: datacls.ModSettings) -> datacls.Repo:
     instance = (settings.instance or "https://codeberg.org").removesuffix("/")
-    resp = requests.get(f"{instance}/api/v1/repos/{settings.repo}", timeout=60)
-    repo_data = resp.json()
-    commits_resp = requests.get(
-        f"{instance}/api/v1/repos/{settings.repo}/commits", timeout=10
+    repo_data, commits_data = await asyncio.gather(
+        SESSIONS.get_json(f"{instance}/api/v1/repos/{settings.repo}", timeout=60),
+        SESSIONS.get_json(f"{instance}/api/v1/repos/{settings.repo}/commits", timeout=10),
     )
-    commits_data = commits_resp.json()
     contributors = list(
         set(commit["commit"]["author"]["name"] for commit in commits_data)
     )
@@ -28,23 +61,24 @@ def get_repo(settings: datacls.ModSettings) -> datacls.Repo:
     )
 
 
-def get_releases(settings: datacls.ModSettings, repo: datacls.Repo):
+async def get_releases(settings: datacls.ModSettings, repo: datacls.Repo):
     instance = (settings.instance or "https://codeberg.org").removesuffix("/")
-    resp = requests.get(f"{instance}/api/v1/repos/{repo.name}/releases", timeout=60)
-    releases_data = resp.json()
+    releases_data = await SESSIONS.get_json(
+        f"{instance}/api/v1/repos/{repo.name}/releases", timeout=60
+    )
     return [
         datacls.Release(
             tag=r["tag_name"],
             version=r["tag_name"].removeprefix("v").removeprefix("V"),
-            title=r["name"],
-            body=r["body"],
             attached_files=[
                 (a["name"], a["browser_download_url"]) for a in r["assets"]
             ],
             by=r["author"]["login"],
-            published_at=datetime.strptime(
-                r["published_at"].replace(":", ""), "%Y-%m-%dT%H%M%S%z"
-            ).timestamp(),
+            published_at=int(
+                datetime.strptime(
+                    r["published_at"].replace(":", ""), "%Y-%m-%dT%H%M%S%z"
+                ).timestamp()
+            ),
             prerelease=r["prerelease"],
             link=r["html_url"],
             is_prebuilt=True,
@@ -53,7 +87,9 @@ def get_releases(settings: datacls.ModSettings, repo: datacls.Repo):
     ]
 
 
-def get_latest_commit_as_release(settings: datacls.ModSettings, repo: datacls.Repo):
+async def get_latest_commit_as_release(
+    settings: datacls.ModSettings, repo: datacls.Repo
+):
     """
 
     :param settings: datacls.ModSettings:
@@ -63,19 +99,20 @@ def get_latest_commit_as_release(settings: datacls.ModSettings, repo: datacls.Re
 
     """
     instance = (settings.instance or "https://codeberg.org").removesuffix("/")
-    resp = requests.get(f"{instance}/api/v1/repos/{repo.name}/commits", timeout=60)
-    commits_data = resp.json()
+    commits_data = await SESSIONS.get_json(
+        f"{instance}/api/v1/repos/{repo.name}/commits", timeout=60
+    )
     commit = commits_data[0]
     return datacls.Release(
         tag=commit["sha"],
         version="dev",
-        title=commit["commit"]["message"].split("\n")[0],
-        body=commit["commit"]["message"],
         attached_files=[],
         by=commit["commit"]["author"]["name"],
-        published_at=datetime.strptime(
-            commit["created"].replace(":", ""), "%Y-%m-%dT%H%M%S%z"
-        ).timestamp(),
+        published_at=int(
+            datetime.strptime(
+                commit["created"].replace(":", ""), "%Y-%m-%dT%H%M%S%z"
+            ).timestamp()
+        ),
         prerelease=True,
         link=commit["html_url"],
         is_prebuilt=False,
@@ -1,50 +1,309 @@
-from functools import lru_cache
+import asyncio
+from collections import Counter
+from datetime import datetime
+from typing import Optional
 
 import environs
-from github import Auth, Github
+from loguru import logger
 
 from .. import datacls
+from ..http import SESSIONS
+from ..ratelimit import RateLimiter
 
 env = environs.Env()
 env.read_env()
 
-auth = Auth.Token(env("GITHUB_TOKEN"))
-g = Github(auth=auth)
+API_URL = env("GITHUB_API_URL", "https://api.github.com").removesuffix("/")
+GRAPHQL_URL = env("GITHUB_GRAPHQL_URL", API_URL + "/graphql")
+HEADERS = {
+    "Accept": "application/vnd.github+json",
+    "Authorization": f"Bearer {env('GITHUB_TOKEN')}",
+    "X-GitHub-Api-Version": "2022-11-28",
+}
+PER_PAGE = 100
+BATCH_SIZE = 20
 
-g_get_repo = lru_cache(maxsize=128)(g.get_repo)
+# Requests kept back from the scheduler, so a run never drains the whole budget of the token.
+CORE_LIMITER = RateLimiter("GitHub", reserve=env.int("GITHUB_RATE_LIMIT_RESERVE", 100))
+GRAPHQL_LIMITER = RateLimiter("GitHub GraphQL", reserve=env.int("GITHUB_RATE_LIMIT_RESERVE", 100))
+SESSIONS.limit(API_URL, CORE_LIMITER)
+SESSIONS.limit(GRAPHQL_URL, GRAPHQL_LIMITER)
 
+REPOSITORY_FRAGMENT = """
+fragment RepositoryFields on Repository {
+  nameWithOwner
+  url
+  pushedAt
+  updatedAt
+  owner { login }
+  defaultBranchRef {
+    name
+    target {
+      ... on Commit {
+        oid
+        authoredDate
+        url
+        author { name user { login } }
+        history(first: 100) { nodes { author { user { login } } } }
+      }
+    }
+  }
+  releases(first: 100, orderBy: {field: CREATED_AT, direction: DESC}) {
+    pageInfo { hasNextPage }
+    nodes {
+      databaseId
+      tagName
+      isDraft
+      isPrerelease
+      publishedAt
+      url
+      author { login }
+      releaseAssets(first: 100) {
+        pageInfo { hasNextPage }
+        nodes { name downloadUrl }
+      }
+    }
+  }
+}
+"""
 
-def get_repo(settings: datacls.ModSettings) -> datacls.Repo:
-    repo = g_get_repo(settings.repo)
+_prefetched: dict[str, dict] = {}
+
+
+async def _get(path: str, **params):
+    return await SESSIONS.get_json(
+        f"{API_URL}{path}", headers=HEADERS, params=params or None
+    )
+
+
+async def _get_all(path: str, **params) -> list:
+    items = []
+    page = 1
+    while True:
+        data = await _get(path, per_page=PER_PAGE, page=page, **params) or []
+        items.extend(data)
+        if len(data) < PER_PAGE:
+            return items
+        page += 1
+
+
+async def _prefetch_batch(repos: list[str]):
+    variables = {}
+    fields = []
+    for i, full_name in enumerate(repos):
+        variables[f"owner{i}"], variables[f"name{i}"] = full_name.split("/", 1)
+        fields.append(
+            f"r{i}: repository(owner: $owner{i}, name: $name{i}) {{ ...RepositoryFields }}"
+        )
+    query = (
+        "query("
+        + ", ".join(f"$owner{i}: String!, $name{i}: String!" for i in range(len(repos)))
+        + ") {\n"
+        + "\n".join(fields)
+        + "\n}\n"
+        + REPOSITORY_FRAGMENT
+    )
+    result = await SESSIONS.post_json(
+        GRAPHQL_URL, {"query": query, "variables": variables}, headers=HEADERS
+    )
+    for error in result.get("errors") or []:
+        logger.debug(f"GraphQL error: {error.get('message')}")
+    data = result.get("data") or {}
+    for i, full_name in enumerate(repos):
+        if data.get(f"r{i}"):
+            _prefetched[full_name.lower()] = data[f"r{i}"]
+
+
+async def prefetch(settings: list[datacls.ModSettings]):
+    """Load the metadata of many repositories with batched GraphQL queries.
+
+    ``get_repo``, ``get_releases`` and ``get_latest_commit_as_release`` use the prefetched
+    data when possible, and fall back to the REST API otherwise.
+
+    :param settings: list[datacls.ModSettings]: the mods to prefetch
+
+    """
+    repos = list(dict.fromkeys(s.repo for s in settings))
+    for full_name in repos:
+        _prefetched.pop(full_name.lower(), None)
+    batches = [repos[i : i + BATCH_SIZE] for i in range(0, len(repos), BATCH_SIZE)]
+    logger.info(
+        f"Prefetching {len(repos)} GitHub repositories in {len(batches)} GraphQL queries..."
+    )
+    results = await asyncio.gather(
+        *(_prefetch_batch(batch) for batch in batches), return_exceptions=True
+    )
+    for result in results:
+        if isinstance(result, Exception):
+            logger.warning(
+                f"GraphQL prefetch failed, falling back to the REST API: {result}"
+            )
+
+
+def _get_prefetched(settings: datacls.ModSettings) -> Optional[dict]:
+    return _prefetched.get(settings.repo.lower())
+
+
+def _is_complete(node: dict) -> bool:
+    return not node["releases"]["pageInfo"]["hasNextPage"] and not any(
+        r["releaseAssets"]["pageInfo"]["hasNextPage"] for r in node["releases"]["nodes"]
+    )
+
+
+async def budget() -> Optional[int]:
+    """Get the REST API requests left for this run, None if unknown.
+
+    Querying the rate limit doesn't count against it.
+    """
+    try:
+        await _get("/rate_limit")
+    except Exception as e:
+        logger.warning(f"Couldn't query the GitHub rate limit: {e}")
+    return CORE_LIMITER.budget()
+
+
+def cost(settings: datacls.ModSettings) -> int:
+    """Estimate the REST API requests needed to load a mod.
+
+    :param settings: datacls.ModSettings: the mod
+
+    """
+    node = _get_prefetched(settings)
+    if node and _get_head_commit(node) and _is_complete(node):
+        return 0
+    # fingerprint (repo and latest release), repo, contributors and releases,
+    # and the latest commit twice for dev builds
+    return 7 if settings.dev_builds else 5
+
+
+def changed_at(settings: datacls.ModSettings) -> Optional[float]:
+    """Get when the repository of a mod was last pushed to, if known.
+
+    :param settings: datacls.ModSettings: the mod
+
+    """
+    node = _get_prefetched(settings)
+    if node and node.get("pushedAt"):
+        return datetime.fromisoformat(node["pushedAt"]).timestamp()
+    return None
+
+
+def _get_head_commit(node: dict) -> Optional[dict]:
+    return (node.get("defaultBranchRef") or {}).get("target")
+
+
+async def fingerprint(settings: datacls.ModSettings) -> dict:
+    """Get what changes when the output of a mod may change, with as few requests as possible.
+
+    The asset names of the latest release are included, as jars are often uploaded after
+    the release was created.
+
+    :param settings: datacls.ModSettings: the mod
+
+    """
+    node = _get_prefetched(settings)
+    if node:
+        releases = [r for r in node["releases"]["nodes"] if not r["isDraft"]]
+        return {
+            "pushed_at": node["pushedAt"],
+            "updated_at": node["updatedAt"],
+            "release": releases[0]["databaseId"] if releases else None,
+            "assets": (
+                [asset["name"] for asset in releases[0]["releaseAssets"]["nodes"]]
+                if releases
+                else []
+            ),
+            "head": (
+                (_get_head_commit(node) or {}).get("oid") if settings.dev_builds else None
+            ),
+        }
+    repo, releases = await asyncio.gather(
+        _get(f"/repos/{settings.repo}"),
+        _get(f"/repos/{settings.repo}/releases", per_page=1),
+    )
+    head = None
+    if settings.dev_builds:
+        head = (await _get(f"/repos/{settings.repo}/commits", per_page=1))[0]["sha"]
+    return {
+        "pushed_at": repo["pushed_at"],
+        "updated_at": repo["updated_at"],
+        "release": releases[0]["id"] if releases else None,
+        "assets": [asset["name"] for asset in releases[0]["assets"]] if releases else [],
+        "head": head,
+    }
+
+
+async def get_repo(settings: datacls.ModSettings) -> datacls.Repo:
+    node = _get_prefetched(settings)
+    if node and _get_head_commit(node):
+        authors = Counter(
+            commit["author"]["user"]["login"]
+            for commit in _get_head_commit(node)["history"]["nodes"]
+            if commit["author"] and commit["author"]["user"]
+        )
+        return datacls.Repo(
+            name=node["nameWithOwner"],
+            git_url=node["url"] + ".git",
+            html_url=node["url"],
+            issue_url=node["url"] + "/issues",
+            owner=node["owner"]["login"],
+            authors=[login for login, _ in authors.most_common()],
+            master_branch=node["defaultBranchRef"]["name"],
+        )
+    repo, contributors = await asyncio.gather(
+        _get(f"/repos/{settings.repo}"),
+        _get_all(f"/repos/{settings.repo}/contributors"),
+    )
     return datacls.Repo(
-        name=repo.full_name,
-        git_url=repo.clone_url,
-        html_url=repo.html_url,
-        issue_url=repo.html_url + "/issues",
-        owner=repo.owner.login,
-        authors=[c.login for c in repo.get_contributors()],
-        master_branch=repo.default_branch,
+        name=repo["full_name"],
+        git_url=repo["clone_url"],
+        html_url=repo["html_url"],
+        issue_url=repo["html_url"] + "/issues",
+        owner=repo["owner"]["login"],
+        authors=[c["login"] for c in contributors],
+        master_branch=repo["default_branch"],
     )
 
 
-def get_releases(settings: datacls.ModSettings, repo: datacls.Repo):
+async def get_releases(settings: datacls.ModSettings, repo: datacls.Repo):
+    node = _get_prefetched(settings)
+    if node and _is_complete(node):
+        return [
+            datacls.Release(
+                tag=r["tagName"],
+                version=r["tagName"].removeprefix("v").removeprefix("V"),
+                attached_files=[
+                    (a["name"], a["downloadUrl"]) for a in r["releaseAssets"]["nodes"]
+                ],
+                by=(r["author"] or {}).get("login"),
+                published_at=int(
+                    datetime.fromisoformat(r["publishedAt"]).timestamp()
+                ),
+                prerelease=r["isPrerelease"],
+                link=r["url"],
+            )
+            for r in node["releases"]["nodes"]
+            if not r["isDraft"]
+        ]
     return [
         datacls.Release(
-            tag=r.tag_name,
-            version=r.tag_name.removeprefix("v").removeprefix("V"),
-            title=r.title,
-            body=r.body,
-            attached_files=[(a.name, a.browser_download_url) for a in r.get_assets()],
-            by=r.author.login,
-            published_at=r.published_at.timestamp(),
-            prerelease=r.prerelease,
-            link=r.html_url,
+            tag=r["tag_name"],
+            version=r["tag_name"].removeprefix("v").removeprefix("V"),
+            attached_files=[
+                (a["name"], a["browser_download_url"]) for a in r["assets"]
+            ],
+            by=r["author"]["login"],
+            published_at=int(datetime.fromisoformat(r["published_at"]).timestamp()),
+            prerelease=r["prerelease"],
+            link=r["html_url"],
         )
-        for r in g_get_repo(settings.repo).get_releases()
+        for r in await _get_all(f"/repos/{repo.name}/releases")
     ]
 
 
-def get_latest_commit_as_release(settings: datacls.ModSettings, repo: datacls.Repo):
+async def get_latest_commit_as_release(
+    settings: datacls.ModSettings, repo: datacls.Repo
+):
     """
 
     :param settings: datacls.ModSettings:
@@ -53,16 +312,34 @@ def get_latest_commit_as_release(settings: datacls.ModSettings, repo: datacls.Re
     :param repo: datacls.Repo:
 
     """
-    latest_commit = g_get_repo(settings.repo).get_commits()[0]
+    node = _get_prefetched(settings)
+    if node and (commit := _get_head_commit(node)):
+        return datacls.Release(
+            tag=commit["oid"],
+            version="dev",
+            attached_files=[],
+            by=((commit["author"] or {}).get("user") or {}).get("login")
+            or (commit["author"] or {}).get("name"),
+            published_at=int(
+                datetime.fromisoformat(commit["authoredDate"]).timestamp()
+            ),
+            prerelease=True,
+            link=commit["url"],
+            is_prebuilt=False,
+        )
+    latest_commit = (await _get(f"/repos/{repo.name}/commits", per_page=1))[0]
     return datacls.Release(
-        tag=latest_commit.sha,
+        tag=latest_commit["sha"],
         version="dev",
-        title=latest_commit.commit.message.split("\n")[0],
-        body=latest_commit.commit.message,
         attached_files=[],
-        by=latest_commit.author.login,
-        published_at=latest_commit.commit.author.date.timestamp(),
+        by=(latest_commit["author"] or {}).get("login")
+        or latest_commit["commit"]["author"]["name"],
+        published_at=int(
+            datetime.fromisoformat(
+                latest_commit["commit"]["author"]["date"]
+            ).timestamp()
+        ),
         prerelease=True,
-        link=latest_commit.html_url,
+        link=latest_commit["html_url"],
         is_prebuilt=False,
     )
@@ -0,0 +1,85 @@
+import json
+import os
+import pathlib
+import shutil
+import time
+from typing import Iterable
+
+from loguru import logger
+
+from .utils import write_atomic
+
+
+class Site:
+    """Assembles the files that are served in one directory, to be deployed as it is.
+
+    Only the given files end up in the directory, instead of the whole working directory with
+    its cache. Files are hard linked where possible and copied otherwise. A manifest lists
+    the served files and the ones removed since the last publish.
+    """
+
+    def __init__(self, directory: str = "site", manifest: str = "manifest.json"):
+        self.directory = pathlib.Path(directory)
+        self.manifest = manifest
+
+    def _place(self, source: pathlib.Path, target: pathlib.Path) -> bool:
+        if target.exists():
+            if os.path.samefile(source, target):
+                return False
+            source_stat, target_stat = source.stat(), target.stat()
+            if (
+                source_stat.st_size == target_stat.st_size
+                and source_stat.st_mtime == target_stat.st_mtime
+            ):
+                return False
+            target.unlink()
+        target.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.link(source, target)
+        except OSError:
+            shutil.copy2(source, target)
+        return True
+
+    def publish(self, paths: Iterable[str]) -> dict:
+        """Make the directory hold exactly the given files, and write the manifest.
+
+        :param paths: the files to serve, relative to the working directory
+        :returns: the manifest
+
+        """
+        served = sorted(
+            {pathlib.Path(path).as_posix() for path in paths if os.path.isfile(path)}
+        )
+        placed = sum(
+            self._place(pathlib.Path(path), self.directory / path) for path in served
+        )
+        pruned = []
+        if self.directory.is_dir():
+            for root, dirs, files in os.walk(self.directory, topdown=False):
+                for name in files:
+                    path = pathlib.Path(root, name)
+                    relative = path.relative_to(self.directory).as_posix()
+                    if relative != self.manifest and relative not in served:
+                        path.unlink()
+                        pruned.append(relative)
+                for name in dirs:
+                    try:
+                        os.rmdir(os.path.join(root, name))
+                    except OSError:
+                        pass
+        files = {path: os.path.getsize(path) for path in served}
+        manifest = {
+            "published": time.time(),
+            "bytes": sum(files.values()),
+            "files": files,
+            "pruned": sorted(pruned),
+        }
+        write_atomic(self.directory / self.manifest, json.dumps(manifest, indent=4))
+        logger.info(
+            f"Published {len(files)} files ({manifest['bytes'] / 2**20:.1f} MiB) to {self.directory}/: "
+            f"{placed} updated, {len(pruned)} removed."
+        )
+        return manifest
+
+
+SITE = Site()
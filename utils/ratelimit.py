@@ -0,0 +1,93 @@
+import asyncio
+import time
+from email.utils import parsedate_to_datetime
+from typing import Mapping, Optional
+
+from loguru import logger
+
+
+class RateLimitExceeded(Exception):
+    pass
+
+
+class RateLimiter:
+    """Tracks the request budget an API reports in its ``X-RateLimit-*`` headers.
+
+    Requests wait for a ``Retry-After`` (secondary rate limits) to pass. Once the budget is
+    down to ``reserve``, requests wait for the reset if it is at most ``max_wait`` seconds
+    away, and fail with ``RateLimitExceeded`` otherwise.
+    """
+
+    def __init__(self, name: str, reserve: int = 0, max_wait: float = 60, retries: int = 3):
+        self.name = name
+        self.reserve = reserve
+        self.max_wait = max_wait
+        self.retries = retries
+        self.limit: Optional[int] = None
+        self.remaining: Optional[int] = None
+        self.reset: Optional[float] = None
+        self.blocked_until = 0.0
+
+    def budget(self) -> Optional[int]:
+        """Requests that can still be made before the reserve is reached, None if unknown."""
+        if self.remaining is None or (self.reset is not None and self.reset <= time.time()):
+            return None
+        return max(self.remaining - self.reserve, 0)
+
+    def update(self, headers: Mapping[str, str]):
+        """Update the budget from the headers of a response.
+
+        :param headers: the response headers
+
+        """
+        if "X-RateLimit-Remaining" in headers:
+            self.remaining = int(headers["X-RateLimit-Remaining"])
+        if "X-RateLimit-Limit" in headers:
+            self.limit = int(headers["X-RateLimit-Limit"])
+        if "X-RateLimit-Reset" in headers:
+            self.reset = float(headers["X-RateLimit-Reset"])
+
+    def retry_delay(self, status: int, headers: Mapping[str, str]) -> Optional[float]:
+        """Get how long to wait before retrying a rate limited request.
+
+        :param status: the response status
+        :param headers: the response headers
+        :returns: the delay in seconds, None if the request wasn't rate limited
+
+        """
+        if status not in (403, 429):
+            return None
+        if "Retry-After" in headers:
+            value = headers["Retry-After"]
+            try:
+                delay = float(value)
+            except ValueError:
+                delay = parsedate_to_datetime(value).timestamp() - time.time()
+        elif self.remaining == 0 and self.reset is not None:
+            delay = self.reset - time.time() + 1
+        elif status == 429:
+            delay = 60
+        else:
+            return None
+        delay = max(delay, 0)
+        self.blocked_until = max(self.blocked_until, time.time() + delay)
+        return delay
+
+    async def wait(self):
+        """Wait until a request may be sent."""
+        delay = self.blocked_until - time.time()
+        if delay <= 0 and self.budget() == 0 and self.reset is not None:
+            delay = self.reset - time.time() + 1
+        if delay <= 0:
+            return
+        if delay > self.max_wait:
+            raise RateLimitExceeded(
+                f"{self.name} rate limit exhausted, resets in {delay:.0f}s"
+            )
+        logger.warning(f"{self.name} rate limit reached, waiting {delay:.0f}s...")
+        await asyncio.sleep(delay)
+
+    def stats(self) -> str:
+        if self.remaining is None:
+            return "budget unknown"
+        return f"{self.remaining}/{self.limit} left, resets at {time.strftime('%H:%M:%S', time.localtime(self.reset))}"
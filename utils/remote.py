@@ -0,0 +1,92 @@
+import asyncio
+import hashlib
+import json
+from typing import Optional
+
+import hjson
+
+from .http import SESSIONS
+from .store import JsonStore
+from .utils import TMP_DIRS
+
+
+def parse_repo_file(address: str, body: bytes) -> dict:
+    """Parse a repo file, using the fast json parser unless the file is hjson.
+
+    :param address: the url the file was loaded from
+    :param body: the content of the file
+
+    """
+    text = body.decode("utf-8")
+    if not address.endswith(".hjson"):
+        try:
+            return json.loads(text)
+        except ValueError:
+            pass
+    return hjson.loads(text)
+
+
+def summarize(res: dict) -> dict:
+    """Keep only what the repo mapping needs from a repo file.
+
+    :param res: the parsed repo file
+
+    """
+    return {
+        "rootId": res.get("rootId"),
+        "hasRootId": "rootId" in res,
+        "mods": [mod.get("id") for mod in res["mods"]] if "mods" in res else None,
+    }
+
+
+class RemoteRepos:
+    """Loads remote repo files, and remembers their summary by content hash.
+
+    Unchanged files are revalidated through the http cache and are not parsed again.
+    """
+
+    def __init__(self, *sub):
+        self.store = JsonStore(TMP_DIRS.get_path_nc(*sub))
+        self.hits = 0
+        self.misses = 0
+
+    async def load(self, address: str, timeout: float = 10) -> dict:
+        """
+
+        :param address: url of the repo file
+        :param timeout: total timeout in seconds
+        :returns: see ``summarize``
+
+        """
+        body = await SESSIONS.get(address, timeout=timeout)
+        digest = hashlib.sha256(body).hexdigest()
+        entry = self.store.data.get(address)
+        if entry and entry["digest"] == digest:
+            self.hits += 1
+            return entry["summary"]
+        self.misses += 1
+        summary = summarize(await asyncio.to_thread(parse_repo_file, address, body))
+        self.store.data[address] = {"digest": digest, "summary": summary}
+        return summary
+
+    async def load_all(self, addresses: list[str]) -> list[Optional[dict] | Exception]:
+        """Load many repo files concurrently.
+
+        :param addresses: urls of the repo files
+        :returns: a summary or the exception raised while loading it, for each address
+
+        """
+        results = await asyncio.gather(
+            *(self.load(address) for address in addresses), return_exceptions=True
+        )
+        for address in list(self.store.data):
+            if address not in addresses:
+                del self.store.data[address]
+        self.store.save()
+        return results
+
+    def stats(self) -> str:
+        return f"{self.hits} unchanged, {self.misses} parsed"
+
+
+REMOTE_REPOS = RemoteRepos("remote_repos.json")
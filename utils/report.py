@@ -0,0 +1,220 @@
+import json
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from .utils import write_atomic
+
+
+def _empty_totals() -> dict:
+    return {"runs": 0, "failures": 0, "seconds": 0.0, "bytes": 0, "cache_hits": 0}
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class RunReport:
+    """Collects durations, transferred bytes, cache hits and failures of every stage of a run.
+
+    Stages are recorded per mod and release where they belong to one, requests per host.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.records: list[dict] = []
+        self.hosts: dict[str, dict] = defaultdict(
+            lambda: {"requests": 0, "not_modified": 0, "failures": 0, "bytes": 0, "seconds": 0.0}
+        )
+        self.extra: dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            self.records.clear()
+            self.hosts.clear()
+            self.extra.clear()
+
+    @contextmanager
+    def stage(
+        self, stage: str, mod: Optional[str] = None, release: Optional[str] = None
+    ) -> Iterator[dict]:
+        """Time a stage. The yielded record can be updated with ``bytes``, ``cache_hit`` and ``failed``.
+
+        Exceptions raised inside the block mark the stage as failed.
+
+        :param stage: name of the stage, like "download"
+        :param mod: the mod the stage works on
+        :param release: the release the stage works on
+
+        """
+        record = {
+            "stage": stage,
+            "mod": mod,
+            "release": release,
+            "bytes": 0,
+            "cache_hit": False,
+            "failed": False,
+        }
+        start = time.perf_counter()
+        try:
+            yield record
+        except BaseException:
+            record["failed"] = True
+            raise
+        finally:
+            record["seconds"] = time.perf_counter() - start
+            with self._lock:
+                self.records.append(record)
+
+    @contextmanager
+    def capture(self) -> Iterator[list[dict]]:
+        """Move the records of the stages run inside the block to the yielded list.
+
+        Used in worker processes, whose records are sent back and passed to ``merge``.
+        """
+        with self._lock:
+            start = len(self.records)
+        records: list[dict] = []
+        try:
+            yield records
+        finally:
+            with self._lock:
+                records.extend(self.records[start:])
+                del self.records[start:]
+
+    def merge(self, records: list[dict]):
+        """Add records captured in another process.
+
+        :param records: the records
+
+        """
+        with self._lock:
+            self.records.extend(records)
+
+    def request(
+        self, host: str, seconds: float, size: int, status: Optional[int] = None
+    ):
+        """Record an http request.
+
+        :param host: the host the request went to
+        :param seconds: how long it took
+        :param size: bytes received
+        :param status: the response status, None if there was no response
+
+        """
+        with self._lock:
+            totals = self.hosts[host]
+            totals["requests"] += 1
+            totals["seconds"] += seconds
+            totals["bytes"] += size
+            if status == 304:
+                totals["not_modified"] += 1
+            if status is None or status >= 400:
+                totals["failures"] += 1
+
+    def _totals(self, records: list[dict]) -> dict[str, dict]:
+        totals = defaultdict(_empty_totals)
+        for record in records:
+            stage = totals[record["stage"]]
+            stage["runs"] += 1
+            stage["failures"] += record["failed"]
+            stage["seconds"] += record["seconds"]
+            stage["bytes"] += record["bytes"]
+            stage["cache_hits"] += record["cache_hit"]
+        return dict(totals)
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            records = list(self.records)
+            hosts = {host: dict(totals) for host, totals in self.hosts.items()}
+        mods = defaultdict(lambda: {"stages": [], "releases": defaultdict(list)})
+        for record in records:
+            if record["mod"] is None:
+                continue
+            if record["release"] is None:
+                mods[record["mod"]]["stages"].append(record)
+            else:
+                mods[record["mod"]]["releases"][record["release"]].append(record)
+        return {
+            "started": self.started,
+            "seconds": time.time() - self.started,
+            "stages": self._totals(records),
+            "mods": {
+                mod: {
+                    "seconds": sum(
+                        r["seconds"]
+                        for r in data["stages"]
+                        + [r for rs in data["releases"].values() for r in rs]
+                    ),
+                    "stages": self._totals(data["stages"]),
+                    "releases": {
+                        release: self._totals(rs)
+                        for release, rs in data["releases"].items()
+                    },
+                }
+                for mod, data in mods.items()
+            },
+            "hosts": hosts,
+            "caches": dict(self.extra),
+        }
+
+    def to_prometheus(self, report: Optional[dict] = None) -> str:
+        report = report or self.to_dict()
+        lines = []
+
+        def metric(name: str, kind: str, help_: str, samples: list[tuple[dict, float]]):
+            lines.append(f"# HELP autorepo_{name} {help_}")
+            lines.append(f"# TYPE autorepo_{name} {kind}")
+            for labels, value in samples:
+                label_str = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+                lines.append(
+                    f"autorepo_{name}{{{label_str}}} {value}" if label_str else f"autorepo_{name} {value}"
+                )
+
+        metric("run_seconds", "gauge", "Duration of the last run.", [({}, report["seconds"])])
+        metric("run_timestamp_seconds", "gauge", "Start of the last run.", [({}, report["started"])])
+        for field, help_ in (
+            ("runs", "Times the stage ran."),
+            ("failures", "Times the stage failed."),
+            ("seconds", "Time spent in the stage."),
+            ("bytes", "Bytes transferred or written by the stage."),
+            ("cache_hits", "Times the stage was served from a cache."),
+        ):
+            metric(
+                f"stage_{field}",
+                "gauge",
+                help_,
+                [({"stage": stage}, totals[field]) for stage, totals in report["stages"].items()],
+            )
+        metric(
+            "mod_seconds",
+            "gauge",
+            "Time spent on a mod, summed over all stages.",
+            [({"mod": mod}, data["seconds"]) for mod, data in report["mods"].items()],
+        )
+        for field, help_ in (
+            ("requests", "Requests sent to the host."),
+            ("not_modified", "Requests answered with 304 Not Modified."),
+            ("failures", "Requests that failed."),
+            ("bytes", "Bytes received from the host."),
+            ("seconds", "Time spent waiting for the host."),
+        ):
+            metric(
+                f"host_{field}",
+                "gauge",
+                help_,
+                [({"host": host}, totals[field]) for host, totals in report["hosts"].items()],
+            )
+        return "\n".join(lines) + "\n"
+
+    def write(self, json_path: str = "run-report.json", prometheus_path: str = "run-report.prom"):
+        report = self.to_dict()
+        write_atomic(json_path, json.dumps(report, indent=4))
+        write_atomic(prometheus_path, self.to_prometheus(report))
+
+
+REPORT = RunReport()
@@ -0,0 +1,42 @@
+from . import data as datacls
+from . import provider as providers
+from .previous import PREVIOUS
+
+
+async def schedule(
+    mod_settings: list[datacls.ModSettings],
+) -> tuple[list[datacls.ModSettings], list[datacls.ModSettings]]:
+    """Decide which mods to load now, and which to defer to their previous output.
+
+    For rate limited providers, mods without a previous output come first, then mods whose
+    repository changed most recently. Mods are deferred once their estimated cost exceeds
+    the remaining budget, unless there is no previous output to fall back to.
+
+    :param mod_settings: the configured mods
+    :returns: the mods to load, by priority, and the deferred mods
+
+    """
+    by_provider = {}
+    for settings in mod_settings:
+        by_provider.setdefault(providers.map[settings.provider], []).append(settings)
+    scheduled, deferred = [], []
+    for provider, settings_list in by_provider.items():
+        budget = await provider.budget() if hasattr(provider, "budget") else None
+        if budget is None:
+            scheduled.extend(settings_list)
+            continue
+
+        def priority(settings: datacls.ModSettings):
+            changed_at = (
+                provider.changed_at(settings) or PREVIOUS.changed_at(settings) or 0
+            )
+            return PREVIOUS.get(settings) is not None, -changed_at
+
+        for settings in sorted(settings_list, key=priority):
+            cost = provider.cost(settings)
+            if cost <= budget or PREVIOUS.get(settings) is None:
+                budget -= cost
+                scheduled.append(settings)
+            else:
+                deferred.append(settings)
+    return scheduled, deferred
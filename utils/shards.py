@@ -0,0 +1,122 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+
+from .output import output_paths, write_outputs
+from .store import JsonStore
+from .utils import TMP_DIRS
+
+SHARD_FORMATS = ("json", "min.json")
+
+
+def shard_name(mod_id: str) -> str:
+    """Get a file name for the shard of a mod that is unique, even if the id isn't a safe file name.
+
+    :param mod_id: the id of the mod
+
+    """
+    name = re.sub(r"[^A-Za-z0-9._-]", "_", mod_id).strip(".")
+    if name != mod_id:
+        name += "-" + hashlib.sha256(mod_id.encode("utf-8")).hexdigest()[:8]
+    return name
+
+
+class ShardedOutput:
+    """Writes the repo as a slim index, plus one file per mod with its full version history.
+
+    Shards are only rewritten when their content changed, and removed once their mod is gone.
+    """
+
+    def __init__(self, *sub, directory: str = "mods"):
+        self.store = JsonStore(TMP_DIRS.get_path_nc(*sub))
+        self.directory = directory
+        self.written = 0
+        self.unchanged = 0
+        self.removed = 0
+
+    def index(self, content: dict, address: str) -> dict:
+        """Get the index of a repo file.
+
+        :param content: the repo file content
+        :param address: the address the shards are served from
+
+        """
+        return {
+            **{k: v for k, v in content.items() if k.startswith("_note_")},
+            "indexVersion": 1,
+            "lastUpdated": content["lastUpdated"],
+            "rootId": content["rootId"],
+            "mods": [
+                {
+                    "id": mod["id"],
+                    "name": mod["name"],
+                    "version": mod["version"],
+                    "gameVersion": mod["gameVersion"],
+                    "shard": f"{address.removesuffix('/')}/{self.directory}/{shard_name(mod['id'])}.json",
+                }
+                for mod in content["mods"]
+            ],
+        }
+
+    async def write(self, name: str, content: dict, address: str):
+        """Write the index as ``<name>.index`` and the shards into ``directory``.
+
+        :param name: path of the index files, without extension
+        :param content: the repo file content
+        :param address: the address the shards are served from
+
+        """
+        shards = {shard_name(mod["id"]): mod for mod in content["mods"]}
+        digests = {
+            shard: hashlib.sha256(
+                json.dumps(mod, sort_keys=True).encode("utf-8")
+            ).hexdigest()
+            for shard, mod in shards.items()
+        }
+        changed = [
+            shard
+            for shard, digest in digests.items()
+            if self.store.data.get(shard) != digest
+            or not os.path.exists(os.path.join(self.directory, f"{shard}.json"))
+        ]
+        await asyncio.gather(
+            *(
+                write_outputs(
+                    os.path.join(self.directory, shard), shards[shard], SHARD_FORMATS
+                )
+                for shard in changed
+            )
+        )
+        for shard in list(self.store.data):
+            if shard in shards:
+                continue
+            for path in output_paths(os.path.join(self.directory, shard), SHARD_FORMATS):
+                if os.path.exists(path):
+                    os.remove(path)
+            del self.store.data[shard]
+            self.removed += 1
+        self.store.data.update(digests)
+        self.store.save()
+        self.written += len(changed)
+        self.unchanged += len(shards) - len(changed)
+        await write_outputs(f"{name}.index", self.index(content, address))
+
+    def paths(self, name: str) -> list[str]:
+        """Get every file ``write`` wrote for ``name``, precompressed ones included.
+
+        :param name: path of the index files, without extension
+
+        """
+        return output_paths(f"{name}.index") + [
+            path
+            for shard in self.store.data
+            for path in output_paths(os.path.join(self.directory, shard), SHARD_FORMATS)
+        ]
+
+    def stats(self) -> str:
+        return f"{self.written} written, {self.unchanged} unchanged, {self.removed} removed"
+
+
+SHARDS = ShardedOutput("shards.json")
@@ -0,0 +1,31 @@
+import json
+import pathlib
+
+from loguru import logger
+
+from .utils import write_atomic
+
+
+class JsonStore:
+    """A json object persisted in a file, loaded on first access and written atomically."""
+
+    def __init__(self, path):
+        self.path = pathlib.Path(path)
+        self._data = None
+
+    @property
+    def data(self) -> dict:
+        if self._data is None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._data = json.load(f)
+            except FileNotFoundError:
+                self._data = {}
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable {self.path}: {e}")
+                self._data = {}
+        return self._data
+
+    def save(self):
+        if self._data is not None:
+            write_atomic(self.path, json.dumps(self._data))
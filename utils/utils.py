@@ -1,10 +1,15 @@
+import hashlib
+import io
+import mmap
 import os
 import pathlib
 import re
 import shutil
 import tempfile
+import time
+import zipfile
+from typing import Iterable
 
-import requests
 from git import Repo
 
 
@@ -13,18 +18,32 @@ class TempDirProvider:
         # self.parent = tempfile.mkdtemp()
         # self.parent = os.path.join(tempfile.gettempdir(), "autorepo")
         self.parent = os.path.join(os.getcwd(), ".cache")
+        self.touched: dict[tuple[str], float] = {}
+
+    def touch(self, *sub):
+        """Remember that a directory was used in this run.
+
+        :param *sub: the path of the directory, relative to the parent directory
+
+        """
+        self.touched[sub] = time.time()
 
     def get_temp_dir(self, *sub):
         path = os.path.join(self.parent, *sub)
         os.makedirs(path, exist_ok=True)
+        self.touch(*sub)
         # return tempfile.mkdtemp(dir=path)
         return pathlib.Path(path)
 
     def get_path_nc(self, *sub):
+        self.touch(*sub)
         return os.path.join(self.parent, *sub)
 
     def has_temp_dir(self, *sub):
-        return os.path.exists(os.path.join(self.parent, *sub))
+        if os.path.exists(os.path.join(self.parent, *sub)):
+            self.touch(*sub)
+            return True
+        return False
 
     def delete(self):
         # shutil.rmtree(self.parent, ignore_errors=True)
@@ -110,63 +129,132 @@ class ClonedRepo(TempDir):
         super().__exit__(exc_type, exc_val, exc_tb)
 
 
-class UnzippedJar(TempDir):
-    """ """
+class JarReader:
+    """Reads single entries of a jar without extracting the whole archive.
 
-    def __init__(self, jar_path, sub: tuple[str] = ()):
-        super().__init__(sub=sub, create=False)
-        if not os.path.exists(self.dir):
-            self.create()
-            try:
-                shutil.unpack_archive(jar_path, self.dir, format="zip")
-            except Exception as e:
-                self.delete()
-                raise e
+    Only the central directory and the requested entries are read.
+    """
 
-    def path(self, file) -> pathlib.Path:
+    def __init__(self, jar_path, use_mmap: bool = False):
+        self._file = open(jar_path, "rb")
+        self._map = None
+        try:
+            if use_mmap:
+                self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.zip = zipfile.ZipFile(self._map or self._file)
+        except Exception as e:
+            self.close()
+            raise e
+
+    def has(self, file) -> bool:
         """
 
-        :param file:
+        :param file: path of the entry inside the jar
 
         """
-        return self.dir / file
+        try:
+            self.zip.getinfo(file)
+        except KeyError:
+            return False
+        return True
 
-    def open(self, file, action, **kwargs) -> open:
+    def read(self, file) -> bytes:
         """
 
-        :param file: param *args:
-        :param action: like "r" or "w", gets passed to open()
-        :param **kwargs:
+        :param file: path of the entry inside the jar
 
         """
-        return open(self.path(file), action, **kwargs)
+        return self.zip.read(file)
 
-    def __getitem__(self, file) -> pathlib.Path:
-        return self.path(file)
+    def open(self, file, action="r", **kwargs):
+        """
+
+        :param file: path of the entry inside the jar
+        :param action: "r" for text or "rb" for bytes
+        :param **kwargs: passed to io.TextIOWrapper in text mode
+
+        """
+        f = self.zip.open(file, "r")
+        return f if "b" in action else io.TextIOWrapper(f, **kwargs)
+
+    def close(self):
+        if getattr(self, "zip", None) is not None:
+            self.zip.close()
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
 
     def __enter__(self):
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        super().__exit__(exc_type, exc_val, exc_tb)
+        self.close()
+
+
+def file_sha256(path) -> str:
+    """
+
+    :param path: the file to hash
+
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
 
+# mkstemp creates files only readable by the owner, written files should get the usual permissions
+_UMASK = os.umask(0)
+os.umask(_UMASK)
 
-def download_jar(url, name="download.jar", sub: tuple[str] = ()):
-    if TMP_DIRS.has_temp_dir(*sub):
-        return TMP_DIRS.get_temp_dir(*sub) / name
-    path = TMP_DIRS.get_temp_dir(*sub) / name
+
+def write_atomic(path, content):
+    """Write ``content`` to ``path`` through a temporary file, so readers never see a partial file.
+
+    :param path: the file to write
+    :param content: str or bytes
+
+    """
+    path = pathlib.Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
     try:
-        with open(path, "wb") as f:
-            response = requests.get(url, stream=True, timeout=60)
-            response.raise_for_status()
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
-    except TimeoutError:
-        raise TimeoutError(f"Download timed out: {url}") from None
-    except Exception as e:
-        shutil.rmtree(path.parent, ignore_errors=True)
-        raise e
-    return path
+        with os.fdopen(fd, "wb") as f:
+            f.write(content.encode("utf-8") if isinstance(content, str) else content)
+        os.chmod(tmp_path, 0o666 & ~_UMASK)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def prune_unreferenced(root, referenced: Iterable[str]) -> tuple[int, list[pathlib.Path]]:
+    """Delete every file below ``root`` that isn't referenced, and the directories left empty.
+
+    :param root: the directory to prune
+    :param referenced: paths of the files that are still in use, relative to the working directory
+    :returns: the number of files kept and the deleted files
+
+    """
+    refs = {pathlib.Path(path).as_posix() for path in referenced}
+    kept, pruned = 0, []
+    if not os.path.isdir(root):
+        return kept, pruned
+    for directory, dirs, files in os.walk(root, topdown=False):
+        for name in files:
+            path = pathlib.Path(directory, name)
+            if path.as_posix() in refs:
+                kept += 1
+            else:
+                path.unlink()
+                pruned.append(path)
+        for name in dirs:
+            try:
+                os.rmdir(os.path.join(directory, name))
+            except OSError:
+                pass
+    return kept, pruned
 
 
 def replace_vars(text, vars):
@@ -0,0 +1,101 @@
+from typing import Optional
+
+from crm1.helpers.versions import Version
+from crm1.spec.v2 import RMod
+
+
+def parse_version(version: str) -> Optional[Version]:
+    try:
+        return Version.from_string(version)
+    except (ValueError, AttributeError):
+        return None
+
+
+def normalize_version(version: str) -> str:
+    """Get the form of a version string that equal versions share, like ``1.0`` and ``v1.0.0``.
+
+    :param version: the version string
+
+    """
+    version = version.strip().removeprefix("v").removeprefix("V")
+    parsed = parse_version(version)
+    return parsed.to_string() if parsed is not None else version.lower()
+
+
+def precedence(mod: RMod) -> tuple:
+    """Sort key of a version within its channel, lowest first.
+
+    Semantic versions are compared by major, minor and patch, then a release is higher than its
+    prereleases, whose tags are compared numerically or alphabetically. Versions that aren't
+    semantic versions (like dev builds) are higher than all others. Ties are broken by the
+    publish time.
+
+    :param mod: the version
+
+    """
+    parsed = parse_version(mod.version)
+    if parsed is None:
+        return (1, (), mod.ext.published_at or 0)
+    return (
+        0,
+        (
+            parsed.major,
+            parsed.minor,
+            parsed.patch,
+            not parsed.prerelease_tags,
+            [
+                (0, int(tag), "") if tag.isdigit() else (1, 0, tag)
+                for tag in parsed.prerelease_tags
+            ],
+        ),
+        mod.ext.published_at or 0,
+    )
+
+
+class VersionIndex:
+    """All versions of a mod, deduplicated by their normalized version string."""
+
+    def __init__(self):
+        self._versions: dict[str, RMod] = {}
+
+    def add(self, mod: RMod) -> Optional[RMod]:
+        """Add a version. If there is a version with the same normalized version string, only the
+        one published later is kept.
+
+        :param mod: the version to add
+        :returns: the version that was dropped because of that, if any
+
+        """
+        key = normalize_version(mod.version)
+        existing = self._versions.get(key)
+        if existing is None:
+            self._versions[key] = mod
+            return None
+        if (mod.ext.published_at or 0) > (existing.ext.published_at or 0):
+            self._versions[key] = mod
+            return existing
+        return mod
+
+    def __len__(self) -> int:
+        return len(self._versions)
+
+    def _channel(self, prerelease: bool) -> list[RMod]:
+        return sorted(
+            (mod for mod in self._versions.values() if bool(mod.ext.prerelease) == prerelease),
+            key=precedence,
+            reverse=True,
+        )
+
+    @property
+    def stable(self) -> list[RMod]:
+        """The stable versions, highest first."""
+        return self._channel(False)
+
+    @property
+    def prerelease(self) -> list[RMod]:
+        """The prereleases and dev builds, highest first."""
+        return self._channel(True)
+
+    def ordered(self) -> list[RMod]:
+        """All versions, stable versions first, each channel highest first."""
+        return self.stable + self.prerelease
@@ -0,0 +1,112 @@
+import hashlib
+import hmac
+import json
+from typing import Mapping, NamedTuple, Optional
+from urllib.parse import parse_qs, urlparse
+
+from . import data as datacls
+from . import provider as providers
+
+
+class WebhookEvent(NamedTuple):
+    provider: str
+    event: str
+    repo: str
+    host: str
+    ref: Optional[str]
+    default_branch: Optional[str]
+
+
+def verify(secret: str, headers: Mapping[str, str], body: bytes) -> bool:
+    """Check the HMAC-SHA256 signature GitHub and Forgejo send along with a webhook.
+
+    :param secret: the secret the webhook was configured with
+    :param headers: the request headers
+    :param body: the raw request body
+
+    """
+    signature = (
+        headers.get("X-Hub-Signature-256", "").removeprefix("sha256=")
+        or headers.get("X-Forgejo-Signature")
+        or headers.get("X-Gitea-Signature")
+        or ""
+    )
+    expected = hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(signature, expected)
+
+
+def load(headers: Mapping[str, str], body: bytes) -> dict:
+    """Read the payload of a webhook, sent as json or, like GitHub does by default, as the
+    ``payload`` field of a form.
+
+    :param headers: the request headers
+    :param body: the raw request body
+    :raises ValueError: if the body doesn't hold a json object
+
+    """
+    content_type = headers.get("Content-Type", "").split(";")[0].strip().lower()
+    if content_type == "application/x-www-form-urlencoded":
+        fields = parse_qs(body.decode("utf-8"))
+        if "payload" not in fields:
+            raise ValueError("Form has no payload field")
+        body = fields["payload"][0]
+    payload = json.loads(body)
+    if not isinstance(payload, dict):
+        raise ValueError("Payload is not a json object")
+    return payload
+
+
+def parse(headers: Mapping[str, str], payload: dict) -> Optional[WebhookEvent]:
+    """Read a GitHub or Forgejo webhook.
+
+    :param headers: the request headers
+    :param payload: the json body
+    :returns: the event, None if it isn't about a repository
+
+    """
+    # Forgejo sends the GitHub headers as well, for compatibility, so it is checked first
+    if "X-Forgejo-Event" in headers or "X-Gitea-Event" in headers:
+        provider = "forgejo"
+        event = headers.get("X-Forgejo-Event") or headers["X-Gitea-Event"]
+    elif "X-GitHub-Event" in headers:
+        provider, event = "github", headers["X-GitHub-Event"]
+    else:
+        return None
+    repository = payload.get("repository") or {}
+    if not repository.get("full_name"):
+        return None
+    return WebhookEvent(
+        provider,
+        event,
+        repository["full_name"],
+        urlparse(repository.get("html_url") or "").netloc,
+        payload.get("ref"),
+        repository.get("default_branch"),
+    )
+
+
+def affects(event: WebhookEvent, settings: datacls.ModSettings) -> bool:
+    """Whether an event may change the output of a mod.
+
+    Releases always may, pushes to the default branch only if the mod has dev builds.
+
+    :param event: the event
+    :param settings: settings of the mod
+
+    """
+    provider = providers.map.get(settings.provider)
+    if event.provider == "github":
+        if provider is not providers.github:
+            return False
+    elif (
+        provider is not providers.forgejo
+        or urlparse(settings.instance or "https://codeberg.org").netloc != event.host
+    ):
+        return False
+    if settings.repo.lower() != event.repo.lower():
+        return False
+    if event.event == "release":
+        return True
+    if event.event == "push":
+        return settings.dev_builds and event.ref == f"refs/heads/{event.default_branch}"
+    return False